@@ -13,7 +13,7 @@ def main():
     try:
         # Get authenticated Spotify client
         auth = SpotifyAuth()
-        sp = auth.get_spotify_client()
+        sp = auth.spotify_client
         
         print("🎵 Checking your Liked Songs...")
         
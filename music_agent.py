@@ -12,13 +12,210 @@ try:
 except ImportError:
     SpotifyAuth = None
 import os
+import re
 import json
+import random
 import time
 import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from itertools import count, repeat
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum, auto
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from config import get_config
 
+# How long a current-track lookup is reused before asking Spotify again (seconds)
+CURRENT_TRACK_TTL = 0.5
+
+# How many search/lyrics results to remember per agent
+SEARCH_CACHE_SIZE = 512
+
+# Playback control commands, keyed by the agent method they generate:
+# (AppleScript verb, progress message, failure message, seconds to wait before
+#  verifying playback or None to skip verification, now-playing message, fallback message)
+_PLAYBACK_COMMANDS = {
+    'next_track': ('next track', "⏭️ Skipping to next track...", "❌ Failed to skip to next track", 2,
+                   "⏭️ Skipped to: {name} by {artist}", "⏭️ Skipped to next track (status: {status})"),
+    'previous_track': ('previous track', "⏮️ Skipping to previous track...", "❌ Failed to skip to previous track", 2,
+                       "⏮️ Skipped to: {name} by {artist}", "⏮️ Skipped to previous track (status: {status})"),
+    'pause_playback': ('pause', "⏸️ Pausing playback...", "❌ Failed to pause", None,
+                       None, "⏸️ Playback paused"),
+    'resume_playback': ('play', "▶️ Resuming playback...", "❌ Failed to resume", 1,
+                        "▶️ Resumed: {name} by {artist}", "▶️ Playback resumed"),
+}
+
+# Applied to the shared database connection when it is opened
+_CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',        # Readers don't block the writer, fewer fsyncs
+    'PRAGMA synchronous=NORMAL',      # Safe with WAL, skips the per-commit fsync
+    'PRAGMA mmap_size=268435456',     # 256 MB memory-mapped reads
+    'PRAGMA cache_size=-65536',       # 64 MB page cache
+    'PRAGMA temp_store=MEMORY',
+)
+
+def _playlist_track_row(playlist_id: int, position: int, item: Dict[str, Any]) -> Optional[tuple]:
+    """Project a Spotify playlist item onto a playlist_tracks row (None for removed tracks)"""
+    track = item['track']
+    if track:
+        artists = track['artists']
+        album = track.get('album')
+        return (
+            playlist_id,
+            track['id'],
+            track['name'],
+            artists[0]['name'] if artists else 'Unknown',
+            album['name'] if album else 'Unknown',
+            track['uri'],
+            track.get('duration_ms', 0),
+            item['added_at'],
+            position
+        )
+    return None
+
+# Command parsing patterns, compiled once at import
+# "like john hiatt", "i like artist john hiatt", "like john hiatt artist"
+_LIKE_RE = re.compile(r'like\s+(?:artist\s+)?(?P<artist>[a-z][a-z\s]*?)(?:\s+artist)?\s*$')
+
+# "tag this as high energy", "tag this with "high energy"", "add tag workout music"
+_TAG_RE = re.compile(r'(?:tag this (?:as |with )?|add tag )(?:"(?P<quoted>[^"]+)"|(?P<tag>.+))')
+
+# "find songs tagged high energy", "play songs tagged as "mellow""
+_FIND_TAG_RE = re.compile(r'(?:find|play) songs tagged (?:as |with )?(?:"(?P<quoted>[^"]+)"|(?P<tag>.+))')
+
+_SHUFFLE_PATTERNS = tuple(re.compile(p) for p in (
+    r'shuffle playlist (.+)',
+    r'shuffle (.+?) playlist',
+    r'shuffle (.+)',
+))
+
+# "play playlist road trip", "play the playlist chill vibes"
+_PLAY_PLAYLIST_RE = re.compile(r'play (?:the )?playlist\s+(?P<playlist>.+?)\s*$')
+
+# "play me some enya", "play some odesza"
+_PLAY_SOME_RE = re.compile(r'play (?:me )?some\s+(?P<artist>.+?)\s*$')
+
+# "random from odesza", "play random from chill playlist", "random from playlist chill"
+_RANDOM_FROM_RE = re.compile(r'random from (?:playlist )?(?P<playlist>.+?)(?: playlist)?\s*$')
+
+# "this is a remix of X by Y", "this is cover of X by Y", "this was influenced by X by Y"
+_RELATIONSHIP_RE = re.compile(
+    r'this (?:is (?:a )?|was )?(?P<kind>remix of|cover of|influenced by) (?P<name>[^"]+) by (?P<artist>[^"]+)')
+_RELATIONSHIP_TYPES = {
+    'remix of': 'remix_of',
+    'cover of': 'cover_of',
+    'influenced by': 'influenced_by',
+}
+
+# Keywords used to classify tags and tag-based play requests
+_ENERGY_WORDS = frozenset(('energy', 'energetic', 'pump', 'intense', 'powerful', 'driving'))
+_GENRE_WORDS = frozenset(('rock', 'jazz', 'electronic', 'pop', 'classical', 'hip hop', 'country', 'blues',
+                          'metal', 'punk', 'folk', 'americana', 'roots'))
+_MOOD_WORDS = frozenset(('happy', 'sad', 'mellow', 'chill', 'upbeat', 'relaxing', 'calm', 'peaceful',
+                         'energetic', 'aggressive', 'romantic', 'nostalgic'))
+_TEMPO_WORDS = frozenset(('fast', 'slow', 'medium', 'quick', 'upbeat', 'downtempo'))
+
+_CATEGORY_WORDS = {
+    'energy': _ENERGY_WORDS,
+    'genre': _GENRE_WORDS,
+    'mood': _MOOD_WORDS,
+    'tempo': _TEMPO_WORDS,
+}
+
+def _word_categories(priority: tuple) -> dict:
+    """Map each keyword to (rank, category) for its highest-priority category in priority"""
+    word_categories = {}
+    for rank, category in reversed(tuple(enumerate(priority))):
+        for word in _CATEGORY_WORDS[category]:
+            word_categories[word] = (rank, category)
+    return word_categories
+
+# Categories a new tag may fall into, and what "play some X music" may ask for, in priority order
+_TAG_WORD_CATEGORY = _word_categories(('energy', 'genre', 'mood'))
+_PLAY_WORD_CATEGORY = _word_categories(('mood', 'genre', 'tempo'))
+
+# Words that mark a request as being about a kind of music rather than a name
+_TAG_REQUEST_WORDS = ('music', 'song', 'track')
+_ANALYZE_PHRASES = ("what kind of music", "what genre", "what style", "describe this music")
+_PLAY_TAG_PHRASES = ("play some", "play something", "i want to hear", "put on some")
+
+# Every phrase handle_command routes on, found in a single scan of the command
+_TRIGGERS = (
+    "next track", "skip", "next", "previous track", "back", "previous", "pause", "resume", "unpause",
+    "what's playing", "current track", "like", "artist", "this", "favorites", "favourite",
+    "tag this", "add tag", "show tags", "what tags", "find songs tagged", "play songs tagged",
+    "shuffle", "liked songs", "my liked", "playlist", "list playlists", "show playlists",
+    "play playlist", "play the playlist", "random from", "where they say", "lyrics",
+    "play me some", "play", "playing", "search", "find",
+    "add relationship", "this is", "show relationships", "what relationships",
+) + _ANALYZE_PHRASES + _PLAY_TAG_PHRASES + _TAG_REQUEST_WORDS
+
+# One bit per trigger, so the phrases present in a command fit in a single int
+_TRIGGER_FLAGS = {trigger: 1 << bit for bit, trigger in enumerate(dict.fromkeys(_TRIGGERS))}
+
+def _flags(*triggers: str) -> int:
+    """Return the combined bit mask for the given trigger phrases"""
+    mask = 0
+    for trigger in triggers:
+        mask |= _TRIGGER_FLAGS[trigger]
+    return mask
+
+# Zero-width lookahead so matches may overlap; longest phrases first so each position
+# reports its longest trigger, and _TRIGGER_IMPLIES expands that to the flags of the
+# shorter triggers it contains (e.g. "play some" also means "play")
+_TRIGGER_RE = re.compile('(?=(%s))' % '|'.join(
+    re.escape(trigger) for trigger in sorted(_TRIGGER_FLAGS, key=len, reverse=True)))
+_TRIGGER_IMPLIES = {
+    trigger: _flags(*(other for other in _TRIGGER_FLAGS if other in trigger))
+    for trigger in _TRIGGER_FLAGS
+}
+
+# Words a shuffle pattern can capture that don't look like playlist names
+_NON_PLAYLIST_NAMES = frozenset(('playlist', 'the', 'my'))
+
+# Artists search_track_fuzzy retries with an artist: filter, paired with their lowercase form
+_ARTIST_HINTS = tuple((artist, artist.lower())
+                      for artist in ("Pink Floyd", "Oingo Boingo", "The Beatles", "Queen"))  # Extend as needed
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_WS_RE = re.compile(r'\s+')
+
+def _normalize_query(query: str) -> str:
+    """Lowercase a search query and collapse its whitespace so equivalent queries share a cache entry"""
+    return _WS_RE.sub(' ', query.lower()).strip()
+
+def _tokenize(text: str) -> List[str]:
+    """Split lowercase text into words, followed by adjacent word pairs (for keywords like 'hip hop')"""
+    words = _WORD_RE.findall(text)
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+def _find_triggers(text: str) -> int:
+    """Return the flags of every routing trigger phrase that appears in the lowercase command text"""
+    flags = 0
+    for match in _TRIGGER_RE.finditer(text):
+        flags |= _TRIGGER_IMPLIES[match.group(1)]
+    return flags
+
+def _classify_keywords(tokens, word_categories: dict) -> tuple:
+    """
+    Scan tokens once for keywords in a _word_categories() map
+    Returns (keyword, category) for the first keyword of the highest-priority category found,
+    or (None, None)
+    """
+    best = None
+    for token in tokens:
+        found = word_categories.get(token)
+        if found and (best is None or found[0] < best[0]):
+            best = (found[0], token, found[1])
+            if found[0] == 0:
+                break
+    
+    if best:
+        return best[1], best[2]
+    return None, None
+
 class MusicDatabase:
     """
     SQLite database for managing music agent local state
@@ -31,13 +228,35 @@ class MusicDatabase:
             db_path = get_config().database_path
         
         self.db_path = db_path
+        
+        # One long-lived connection shared by every method (and thread) so SQLite's
+        # statement cache can reuse compiled queries instead of reopening per call
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        for pragma in _CONNECTION_PRAGMAS:
+            self.conn.execute(pragma)
+        
+        # (data_version, rows by lowercase name, rows shortest name first) for playlist lookups
+        self._playlist_index = None
+        
         self.init_database()
         print(f"📁 Database initialized: {self.db_path}")
     
+    @contextmanager
+    def _transaction(self):
+        """Serialize access to the shared connection and commit (or roll back) on exit"""
+        with self._lock, self.conn:
+            yield self.conn
+    
+    def close(self):
+        """Close the shared database connection"""
+        with self._lock:
+            self.conn.close()
+    
     def init_database(self):
         """Initialize the SQLite database with required tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 # Table for favorite artists
@@ -106,10 +325,16 @@ class MusicDatabase:
                         track_count INTEGER DEFAULT 0,
                         spotify_uri TEXT,
                         last_synced TEXT NOT NULL,
-                        added_date TEXT NOT NULL
+                        added_date TEXT NOT NULL,
+                        snapshot_id TEXT                 -- Spotify snapshot the stored tracks came from
                     )
                 ''')
                 
+                # Databases created before snapshot_id was added
+                playlist_columns = {row[1] for row in cursor.execute('PRAGMA table_info(playlists)')}
+                if 'snapshot_id' not in playlist_columns:
+                    cursor.execute('ALTER TABLE playlists ADD COLUMN snapshot_id TEXT')
+                
                 # Table for playlist tracks
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS playlist_tracks (
@@ -168,7 +393,7 @@ class MusicDatabase:
     def add_favorite_artist(self, artist_name: str) -> bool:
         """Add an artist to favorites"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR IGNORE INTO favorite_artists (artist_name, added_date)
@@ -183,7 +408,7 @@ class MusicDatabase:
     def get_favorite_artists(self) -> List[Dict[str, Any]]:
         """Get all favorite artists"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT artist_name, added_date, play_count
@@ -203,7 +428,7 @@ class MusicDatabase:
                 entity_id: str = None, confidence: float = 1.0, added_by: str = 'user') -> bool:
         """Add a tag to an entity (artist, track, album)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO tags 
@@ -219,7 +444,7 @@ class MusicDatabase:
     def get_entities_by_tag(self, tag_category: str, tag_value: str, entity_type: str = None) -> List[Dict[str, Any]]:
         """Get entities that match a specific tag"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 if entity_type:
@@ -250,7 +475,7 @@ class MusicDatabase:
     def get_tags_for_entity(self, entity_type: str, entity_name: str) -> List[Dict[str, Any]]:
         """Get all tags for a specific entity"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT tag_category, tag_value, confidence, added_date
@@ -294,7 +519,7 @@ class MusicDatabase:
     def log_play_history(self, track_name: str, artist_name: str, album_name: str = None, spotify_uri: str = None) -> bool:
         """Log a track play to history"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO play_history (track_name, artist_name, album_name, spotify_uri, played_at)
@@ -317,7 +542,7 @@ class MusicDatabase:
     def get_recent_plays(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent play history"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT track_name, artist_name, album_name, played_at
@@ -338,7 +563,7 @@ class MusicDatabase:
     def set_preference(self, key: str, value: str) -> bool:
         """Set a user preference"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO preferences (key, value, updated_date)
@@ -353,7 +578,7 @@ class MusicDatabase:
     def get_preference(self, key: str, default: str = None) -> Optional[str]:
         """Get a user preference"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT value FROM preferences WHERE key = ?', (key,))
                 result = cursor.fetchone()
@@ -365,41 +590,47 @@ class MusicDatabase:
     # Playlist management methods
     def store_playlist(self, playlist_data: Dict[str, Any]) -> bool:
         """Store a playlist in the database"""
+        return self.store_playlists([playlist_data])
+    
+    def store_playlists(self, playlists: List[Dict[str, Any]]) -> bool:
+        """Store (insert or update) several playlists in one transaction"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Insert or update playlist
-                cursor.execute('''
+            rows = [(
+                playlist_data['id'],
+                playlist_data['name'],
+                playlist_data.get('description', ''),
+                playlist_data['owner']['id'],
+                playlist_data['owner']['display_name'] or playlist_data['owner']['id'],
+                playlist_data.get('public', False),
+                playlist_data.get('collaborative', False),
+                playlist_data['tracks']['total'],
+                playlist_data['uri'],
+                playlist_data['id']  # For the COALESCE check
+            ) for playlist_data in playlists]
+            
+            with self._transaction() as conn:
+                # Insert or update playlists
+                conn.executemany('''
                     INSERT OR REPLACE INTO playlists 
                     (spotify_id, name, description, owner_id, owner_name, is_public, 
                      is_collaborative, track_count, spotify_uri, last_synced, added_date)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), 
                             COALESCE((SELECT added_date FROM playlists WHERE spotify_id = ?), datetime('now')))
-                ''', (
-                    playlist_data['id'],
-                    playlist_data['name'],
-                    playlist_data.get('description', ''),
-                    playlist_data['owner']['id'],
-                    playlist_data['owner']['display_name'] or playlist_data['owner']['id'],
-                    playlist_data.get('public', False),
-                    playlist_data.get('collaborative', False),
-                    playlist_data['tracks']['total'],
-                    playlist_data['uri'],
-                    playlist_data['id']  # For the COALESCE check
-                ))
+                ''', rows)
                 
                 conn.commit()
+                self._playlist_index = None
                 return True
                 
         except Exception as e:
             print(f"❌ Error storing playlist: {e}")
             return False
     
-    def store_playlist_tracks(self, playlist_id: str, tracks: List[Dict[str, Any]]) -> bool:
-        """Store tracks for a playlist"""
+    def store_playlist_tracks(self, playlist_id: str, tracks: List[Dict[str, Any]],
+                              snapshot_id: Optional[str] = None) -> bool:
+        """Store tracks for a playlist, recording the snapshot they were fetched at"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 # Get the database playlist ID
@@ -414,26 +645,17 @@ class MusicDatabase:
                 # Clear existing tracks for this playlist
                 cursor.execute('DELETE FROM playlist_tracks WHERE playlist_id = ?', (db_playlist_id,))
                 
-                # Insert new tracks
-                for position, item in enumerate(tracks):
-                    track = item['track']
-                    if track:  # Some tracks might be None (removed tracks)
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO playlist_tracks 
-                            (playlist_id, spotify_track_id, track_name, artist_name, album_name, 
-                             spotify_uri, duration_ms, added_at, track_position)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            db_playlist_id,
-                            track['id'],
-                            track['name'],
-                            track['artists'][0]['name'] if track['artists'] else 'Unknown',
-                            track['album']['name'] if track.get('album') else 'Unknown',
-                            track['uri'],
-                            track.get('duration_ms', 0),
-                            item['added_at'],
-                            position
-                        ))
+                # Insert new tracks in one sweep, skipping removed tracks (None); map/filter
+                # hand executemany the rows without a Python-level loop or an interim list
+                rows = filter(None, map(_playlist_track_row, repeat(db_playlist_id), count(), tracks))
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO playlist_tracks 
+                    (playlist_id, spotify_track_id, track_name, artist_name, album_name, 
+                     spotify_uri, duration_ms, added_at, track_position)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                
+                cursor.execute('UPDATE playlists SET snapshot_id = ? WHERE id = ?', (snapshot_id, db_playlist_id))
                 
                 conn.commit()
                 return True
@@ -442,10 +664,33 @@ class MusicDatabase:
             print(f"❌ Error storing playlist tracks: {e}")
             return False
     
+    def set_playlist_snapshots(self, snapshots: Dict[str, str]) -> bool:
+        """Record the snapshot of playlists whose stored tracks need no fetch (e.g. empty playlists)"""
+        try:
+            with self._transaction() as conn:
+                conn.executemany('UPDATE playlists SET snapshot_id = ? WHERE spotify_id = ?',
+                                 [(snapshot_id, playlist_id) for playlist_id, snapshot_id in snapshots.items()])
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"❌ Error storing playlist snapshots: {e}")
+            return False
+    
+    def get_playlist_snapshots(self) -> Dict[str, str]:
+        """Map each playlist's Spotify ID to the snapshot its stored tracks came from"""
+        try:
+            with self._transaction() as conn:
+                return dict(conn.execute(
+                    'SELECT spotify_id, snapshot_id FROM playlists WHERE snapshot_id IS NOT NULL'
+                ).fetchall())
+        except Exception as e:
+            print(f"❌ Error getting playlist snapshots: {e}")
+            return {}
+    
     def get_playlists(self, owner_only: bool = True) -> List[Dict[str, Any]]:
         """Get stored playlists"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 if owner_only:
@@ -481,57 +726,50 @@ class MusicDatabase:
             print(f"❌ Error getting playlists: {e}")
             return []
     
-    def find_playlist_by_name(self, name: str, fuzzy: bool = True) -> Optional[Dict[str, Any]]:
-        """Find a playlist by name (exact or fuzzy match)"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Try exact match first
-                cursor.execute('''
+    def _get_playlist_index(self) -> tuple:
+        """
+        Return (rows by lowercase name, rows shortest name first) for the stored playlists
+        Rebuilt after this connection stores a playlist or another connection (e.g. a
+        sync run) commits, which PRAGMA data_version reports without reading the table
+        """
+        with self._lock:
+            data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+            if self._playlist_index is None or self._playlist_index[0] != data_version:
+                rows = self.conn.execute('''
                     SELECT spotify_id, name, description, owner_name, track_count, 
                            spotify_uri, last_synced
                     FROM playlists
-                    WHERE LOWER(name) = LOWER(?)
-                    LIMIT 1
-                ''', (name,))
-                
-                result = cursor.fetchone()
-                if result:
-                    return {
-                        'spotify_id': result[0],
-                        'name': result[1],
-                        'description': result[2],
-                        'owner_name': result[3],
-                        'track_count': result[4],
-                        'spotify_uri': result[5],
-                        'last_synced': result[6]
-                    }
-                
-                # Try fuzzy match if enabled
-                if fuzzy:
-                    cursor.execute('''
-                        SELECT spotify_id, name, description, owner_name, track_count, 
-                               spotify_uri, last_synced
-                        FROM playlists
-                        WHERE LOWER(name) LIKE LOWER(?)
-                        ORDER BY LENGTH(name)
-                        LIMIT 1
-                    ''', (f'%{name}%',))
-                    
-                    result = cursor.fetchone()
-                    if result:
-                        return {
-                            'spotify_id': result[0],
-                            'name': result[1],
-                            'description': result[2],
-                            'owner_name': result[3],
-                            'track_count': result[4],
-                            'spotify_uri': result[5],
-                            'last_synced': result[6]
-                        }
-                
-                return None
+                    ORDER BY id
+                ''').fetchall()
+                by_name = {}
+                for row in rows:
+                    by_name.setdefault(row[1].lower(), row)
+                self._playlist_index = (data_version, by_name, sorted(rows, key=lambda row: len(row[1])))
+            return self._playlist_index[1], self._playlist_index[2]
+    
+    def find_playlist_by_name(self, name: str, fuzzy: bool = True) -> Optional[Dict[str, Any]]:
+        """Find a playlist by name (exact or fuzzy match)"""
+        try:
+            by_name, shortest_first = self._get_playlist_index()
+            name_lower = name.lower()
+            
+            # Try exact match first, then the shortest name containing it if fuzzy
+            result = by_name.get(name_lower)
+            if result is None and fuzzy:
+                result = next((row for row in shortest_first if name_lower in row[1].lower()), None)
+            
+            if result:
+                return {
+                    'spotify_id': result[0],
+                    'name': result[1],
+                    'description': result[2],
+                    'owner_name': result[3],
+                    'track_count': result[4],
+                    'spotify_uri': result[5],
+                    'last_synced': result[6]
+                }
+            
+            return None
                 
         except Exception as e:
             print(f"❌ Error finding playlist: {e}")
@@ -544,7 +782,7 @@ class MusicDatabase:
             if not playlist:
                 return []
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -575,7 +813,7 @@ class MusicDatabase:
                         source_id: str = None, target_id: str = None, added_by: str = 'user') -> bool:
         """Add a musical relationship between two entities"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO musical_relationships 
@@ -595,7 +833,7 @@ class MusicDatabase:
     def get_relationships_for_entity(self, entity_type: str, entity_name: str, entity_artist: str = None) -> List[Dict[str, Any]]:
         """Get all relationships for a specific entity (as source or target)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 # Get relationships where this entity is the source
@@ -637,7 +875,7 @@ class MusicDatabase:
     def get_relationships_by_type(self, relationship_type: str) -> List[Dict[str, Any]]:
         """Get all relationships of a specific type"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT source_type, source_name, source_artist,
@@ -684,6 +922,95 @@ class MusicDatabase:
                                    'track', influencer_name, influencer_artist,
                                    'influenced_by', notes)
 
+class Intent(Enum):
+    """What a natural language command asks the agent to do"""
+    SYNC = auto()
+    NEXT = auto()
+    PREVIOUS = auto()
+    PAUSE = auto()
+    RESUME = auto()
+    NOW_PLAYING = auto()
+    LIKE = auto()
+    FAVORITES = auto()
+    TAG = auto()
+    SHOW_TAGS = auto()
+    FIND_TAGGED = auto()
+    SHUFFLE_LIKED = auto()
+    SHUFFLE_PLAYLIST = auto()
+    LIST_PLAYLISTS = auto()
+    PLAY_PLAYLIST = auto()
+    RANDOM_FROM = auto()
+    ANALYZE = auto()
+    LYRIC_SEARCH = auto()
+    PLAY_TAGGED = auto()
+    PLAY_ARTIST = auto()
+    PLAY = auto()
+    SEARCH = auto()
+    ADD_RELATIONSHIP = auto()
+    SHOW_RELATIONSHIPS = auto()
+    LYRICS = auto()
+
+@dataclass(frozen=True, slots=True)
+class ParsedCmd:
+    """A command split once into the views handle_command needs"""
+    raw: str
+    lower: str
+    tokens: tuple            # Words in order, then adjacent word pairs
+    token_set: frozenset
+    flags: int               # _TRIGGER_FLAGS bits of routing phrases found anywhere in the text
+    
+    def has(self, trigger: str) -> bool:
+        """Whether the routing phrase appears anywhere in the command"""
+        return bool(self.flags & _TRIGGER_FLAGS[trigger])
+    
+    @classmethod
+    def from_command(cls, command: str) -> 'ParsedCmd':
+        lower = command.lower()
+        tokens = tuple(_tokenize(lower))
+        return cls(command, lower, tokens, frozenset(tokens), _find_triggers(lower))
+
+# Checked in order; the first matching rule decides the intent. The order encodes
+# precedence ("play playlist" before "play", "shuffle liked" before "shuffle playlist"),
+# so it cannot simply follow request frequency; see intent_counts for what is hot
+_INTENT_RULES = (
+    (Intent.SYNC, lambda p: p.lower == "sync"),
+    (Intent.NEXT, lambda p, m=_flags("next track", "skip", "next"): p.flags & m),
+    (Intent.PREVIOUS, lambda p, m=_flags("previous track", "back", "previous"): p.flags & m),
+    (Intent.PAUSE, lambda p, m=_flags("pause"): p.flags & m),
+    (Intent.RESUME, lambda p, m=_flags("resume", "unpause"): p.flags & m),
+    (Intent.NOW_PLAYING, lambda p, m=_flags("what's playing", "current track"): p.flags & m),
+    (Intent.LIKE, lambda p, like=_flags("like"), what=_flags("artist", "this"): p.flags & like and p.flags & what),
+    (Intent.FAVORITES, lambda p, m=_flags("favorites", "favourite"): p.flags & m),
+    (Intent.TAG, lambda p, m=_flags("tag this", "add tag"): p.flags & m),
+    (Intent.SHOW_TAGS, lambda p, m=_flags("show tags", "what tags"): p.flags & m),
+    (Intent.FIND_TAGGED, lambda p, m=_flags("find songs tagged", "play songs tagged"): p.flags & m),
+    (Intent.SHUFFLE_LIKED, lambda p, shuffle=_flags("shuffle"), liked=_flags("liked songs", "my liked"): p.flags & shuffle and p.flags & liked),
+    (Intent.SHUFFLE_PLAYLIST, lambda p, m=_flags("shuffle", "playlist"): p.flags & m == m),
+    (Intent.LIST_PLAYLISTS, lambda p, m=_flags("list playlists", "show playlists"): p.flags & m),
+    (Intent.PLAY_PLAYLIST, lambda p, m=_flags("play playlist", "play the playlist"): p.flags & m),
+    (Intent.RANDOM_FROM, lambda p, m=_flags("random from"): p.flags & m),
+    (Intent.ANALYZE, lambda p, m=_flags(*_ANALYZE_PHRASES): p.flags & m),
+    (Intent.LYRIC_SEARCH, lambda p, m=_flags("where they say", "lyrics"): p.flags & m),
+    (Intent.PLAY_TAGGED, lambda p, play=_flags(*_PLAY_TAG_PHRASES), kind=_flags(*_TAG_REQUEST_WORDS): p.flags & play and p.flags & kind),
+    (Intent.PLAY_ARTIST, lambda p, m=_flags("play me some", "play some"): p.flags & m),
+    (Intent.PLAY, lambda p, play=_flags("play"), playing=_flags("playing"): p.flags & play and not p.flags & playing),
+    (Intent.SEARCH, lambda p, m=_flags("search", "find"): p.flags & m),
+    (Intent.ADD_RELATIONSHIP, lambda p, m=_flags("add relationship", "this is"): p.flags & m),
+    (Intent.SHOW_RELATIONSHIPS, lambda p, m=_flags("show relationships", "what relationships"): p.flags & m),
+    (Intent.LYRICS, lambda p, m=_flags("lyrics"): p.flags & m),
+)
+
+def _resolve_intent(parsed: ParsedCmd) -> Optional[Intent]:
+    """Return the intent of the first rule the command matches, or None"""
+    for intent, matches in _INTENT_RULES:
+        if matches(parsed):
+            return intent
+    return None
+
+# Argument-free commands that clients send verbatim, over and over
+_FIXED_COMMANDS = ("sync", "next", "skip", "previous", "pause", "resume", "what's playing",
+                   "favorites", "list playlists", "show tags", "show relationships")
+
 class ComprehensiveMusicAgent:
     """
     A robust music agent that combines:
@@ -697,6 +1024,38 @@ class ComprehensiveMusicAgent:
     def __init__(self, db_path: str = None):
         self.sp = None
         self.db = MusicDatabase(db_path)
+        self._current_track_cache = (0.0, None)  # (monotonic fetch time, track info)
+        self._search_cache = OrderedDict()  # LRU of search/lyrics results
+        self._search_cache_lock = threading.Lock()
+        self.intent_counts = Counter()  # How often each intent is requested, by name
+        self._intent_counts_lock = threading.Lock()  # Daemon workers handle commands concurrently
+        self._handlers = {
+            Intent.SYNC: self._cmd_sync,
+            Intent.NEXT: lambda parsed: self.next_track(),
+            Intent.PREVIOUS: lambda parsed: self.previous_track(),
+            Intent.PAUSE: lambda parsed: self.pause_playback(),
+            Intent.RESUME: lambda parsed: self.resume_playback(),
+            Intent.NOW_PLAYING: self._cmd_now_playing,
+            Intent.LIKE: self._cmd_like,
+            Intent.FAVORITES: self._cmd_favorites,
+            Intent.TAG: self._cmd_tag,
+            Intent.SHOW_TAGS: self._cmd_show_tags,
+            Intent.FIND_TAGGED: self._cmd_find_tagged,
+            Intent.SHUFFLE_LIKED: self._cmd_shuffle_liked,
+            Intent.SHUFFLE_PLAYLIST: self._cmd_shuffle_playlist,
+            Intent.LIST_PLAYLISTS: lambda parsed: self.list_playlists(),
+            Intent.PLAY_PLAYLIST: self._cmd_play_playlist,
+            Intent.RANDOM_FROM: self._cmd_random_from,
+            Intent.ANALYZE: self._cmd_analyze,
+            Intent.LYRIC_SEARCH: self._cmd_lyric_search,
+            Intent.PLAY_TAGGED: self._cmd_play_tagged,
+            Intent.PLAY_ARTIST: self._cmd_play_artist,
+            Intent.PLAY: self._cmd_play,
+            Intent.SEARCH: self._cmd_search,
+            Intent.ADD_RELATIONSHIP: self._cmd_add_relationship,
+            Intent.SHOW_RELATIONSHIPS: self._cmd_show_relationships,
+            Intent.LYRICS: self._cmd_lyrics,
+        }
         self.setup_spotify_connection()
         
     def setup_spotify_connection(self):
@@ -708,7 +1067,7 @@ class ComprehensiveMusicAgent:
                     auth = SpotifyAuth()
                     is_valid, message = auth.check_auth_status()
                     if is_valid:
-                        self.sp = auth.get_spotify_client()
+                        self.sp = auth.spotify_client
                         print("✅ Spotify OAuth connection established (full API access)")
                         return
                     else:
@@ -750,13 +1109,29 @@ class ComprehensiveMusicAgent:
             return f"❌ Unexpected error: {e}"
     
     def get_current_track(self) -> Dict[str, str]:
+        """Get currently playing track info, reusing a lookup from the last half second"""
+        fetched_at, track = self._current_track_cache
+        if track is not None and time.monotonic() - fetched_at < CURRENT_TRACK_TTL:
+            return track
+        
+        track = self._get_current_track_uncached()
+        self._current_track_cache = (time.monotonic(), track)
+        return track
+    
+    def _invalidate_current_track(self):
+        """Forget the cached current track after changing playback"""
+        self._current_track_cache = (0.0, None)
+    
+    def _get_current_track_uncached(self) -> Dict[str, str]:
         """Get currently playing track info via AppleScript"""
         script = '''
         tell application "Spotify"
             if player state is playing then
                 set trackName to name of current track
                 set artistName to artist of current track
-                return trackName & " | " & artistName
+                set trackDuration to duration of current track
+                set trackPosition to player position
+                return trackName & " | " & artistName & " | " & trackDuration & " | " & trackPosition
             else
                 return "Not playing"
             end if
@@ -769,19 +1144,55 @@ class ComprehensiveMusicAgent:
         
         try:
             parts = result.split(" | ")
-            return {
+            track = {
                 "name": parts[0],
                 "artist": parts[1],
                 "status": "playing"
             }
+            if len(parts) == 4:
+                # Duration is in milliseconds, position in (possibly comma-decimal) seconds
+                track["duration_ms"] = int(float(parts[2].replace(",", ".")))
+                track["progress_ms"] = int(float(parts[3].replace(",", ".")) * 1000)
+            return track
         except:
             return {"status": "Error parsing track info"}
     
+    def _cached_lookup(self, key: tuple, fetch):
+        """
+        Return a remembered search result, or fetch and remember it
+        Failed lookups (None) aren't cached so they are retried next time
+        """
+        with self._search_cache_lock:
+            if key in self._search_cache:
+                self._search_cache.move_to_end(key)
+                return self._search_cache[key]
+        
+        result = fetch()
+        if result is not None:
+            with self._search_cache_lock:
+                self._search_cache[key] = result
+                self._search_cache.move_to_end(key)
+                if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                    self._search_cache.popitem(last=False)
+        return result
+    
+    def clear_search_cache(self):
+        """Forget all remembered search and lyrics results"""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+    
     def search_track_fuzzy(self, query: str) -> Optional[Dict[str, Any]]:
         """
         Fuzzy search for tracks using multiple strategies
         Handles partial lyrics, typos, and missing punctuation
         """
+        # Only the cache key is normalized: the searches (and the artist hint stripping in
+        # strategy 2) need the query as written
+        return self._cached_lookup(('track', _normalize_query(query)),
+                                   lambda: self._search_track_fuzzy_uncached(query))
+    
+    def _search_track_fuzzy_uncached(self, query: str) -> Optional[Dict[str, Any]]:
+        """Run the Spotify searches behind search_track_fuzzy"""
         if not self.sp:
             return None
         
@@ -812,9 +1223,9 @@ class ComprehensiveMusicAgent:
                 continue
         
         # Strategy 2: Artist-specific search if query contains artist hints
-        potential_artists = ["Pink Floyd", "Oingo Boingo", "The Beatles", "Queen"]  # Extend as needed
-        for artist in potential_artists:
-            if artist.lower() in query.lower():
+        query_lower = query.lower()
+        for artist, artist_lower in _ARTIST_HINTS:
+            if artist_lower in query_lower:
                 try:
                     artist_query = f'artist:"{artist}" {query.replace(artist, "").strip()}'
                     results = self.sp.search(q=artist_query, type='track', limit=3)
@@ -839,6 +1250,11 @@ class ComprehensiveMusicAgent:
         Search for songs by lyric fragments
         Uses web search and pattern matching
         """
+        return self._cached_lookup(('lyric_search', _normalize_query(lyric_fragment)),
+                                   lambda: self._search_by_lyrics_uncached(lyric_fragment))
+    
+    def _search_by_lyrics_uncached(self, lyric_fragment: str) -> Optional[Dict[str, Any]]:
+        """Match known lyric patterns, falling back to a fuzzy search on key words"""
         print(f"🔍 Searching by lyrics: '{lyric_fragment}'")
         
         # Known lyric patterns (extend this as you discover more)
@@ -905,6 +1321,7 @@ class ComprehensiveMusicAgent:
                     # Try to play the playlist
                     script = f'tell application "Spotify" to play track "{playlist["uri"]}"'
                     result = self.run_applescript(script)
+                    self._invalidate_current_track()
                     
                     if "❌" not in result:
                         time.sleep(3)  # Give it time to start
@@ -994,6 +1411,7 @@ class ComprehensiveMusicAgent:
         
         script = f'tell application "Spotify" to play track "{track_uri}"'
         result = self.run_applescript(script)
+        self._invalidate_current_track()
         
         if "❌" in result:
             print(f"❌ Failed to play track: {result}")
@@ -1021,6 +1439,7 @@ class ComprehensiveMusicAgent:
             # Play the playlist using its Spotify URI
             script = f'tell application "Spotify" to play track "{playlist['spotify_uri']}"'
             result = self.run_applescript(script)
+            self._invalidate_current_track()
             
             if "❌" not in result:
                 time.sleep(3)  # Give it time to start
@@ -1041,7 +1460,6 @@ class ComprehensiveMusicAgent:
             print(f"❌ No tracks found in playlist '{playlist_name}'")
             return False
         
-        import random
         track = random.choice(tracks)
         
         print(f"🎲 Selected: {track['name']} by {track['artist']}")
@@ -1068,7 +1486,6 @@ class ComprehensiveMusicAgent:
                 print("❌ No liked songs found")
                 return False
 
-            import random
             track = random.choice(results['items'])['track']
             print(f"🔀 Selected: {track['name']} by {track['artists'][0]['name']}")
             
@@ -1096,6 +1513,7 @@ class ComprehensiveMusicAgent:
             # Play the playlist using its Spotify URI
             script = f'tell application "Spotify" to play track "{playlist['spotify_uri']}"'
             result = self.run_applescript(script)
+            self._invalidate_current_track()
             
             if "❌" not in result:
                 time.sleep(3)  # Give it time to start
@@ -1118,89 +1536,50 @@ class ComprehensiveMusicAgent:
         if not playlists:
             return "📭 No playlists stored locally. Run 'python3 sync_playlists.py all' to sync from Spotify."
         
-        result = f"📚 {len(playlists)} available playlists:\n"
-        result += "-" * 40 + "\n"
+        parts = [f"📚 {len(playlists)} available playlists:", "-" * 40]
         
         for i, playlist in enumerate(playlists[:20], 1):  # Show first 20
-            result += f"{i:2d}. {playlist['name']} ({playlist['track_count']} tracks)\n"
+            parts.append(f"{i:2d}. {playlist['name']} ({playlist['track_count']} tracks)")
             if playlist['description']:
-                result += f"    {playlist['description'][:50]}...\n"
+                parts.append(f"    {playlist['description'][:50]}...")
         
         if len(playlists) > 20:
-            result += f"\n... and {len(playlists) - 20} more playlists"
-        
-        return result
-    
-    def next_track(self) -> str:
-        """Skip to the next track using AppleScript"""
-        print("⏭️ Skipping to next track...")
-        
-        script = 'tell application "Spotify" to next track'
-        result = self.run_applescript(script)
-        
-        if "❌" in result:
-            return f"❌ Failed to skip to next track: {result}"
-        
-        # Give it a moment to change tracks, then get the new track info
-        time.sleep(2)
-        current = self.get_current_track()
-        if current.get("status") == "playing":
-            return f"⏭️ Skipped to: {current['name']} by {current['artist']}"
-        else:
-            return f"⏭️ Skipped to next track (status: {current.get('status', 'Unknown')})"
-    
-    def previous_track(self) -> str:
-        """Skip to the previous track using AppleScript"""
-        print("⏮️ Skipping to previous track...")
-        
-        script = 'tell application "Spotify" to previous track'
-        result = self.run_applescript(script)
-        
-        if "❌" in result:
-            return f"❌ Failed to skip to previous track: {result}"
+            parts.append(f"\n... and {len(playlists) - 20} more playlists")
         
-        # Give it a moment to change tracks, then get the new track info
-        time.sleep(2)
-        current = self.get_current_track()
-        if current.get("status") == "playing":
-            return f"⏮️ Skipped to: {current['name']} by {current['artist']}"
-        else:
-            return f"⏮️ Skipped to previous track (status: {current.get('status', 'Unknown')})"
+        return "\n".join(parts)
     
-    def pause_playback(self) -> str:
-        """Pause playback using AppleScript"""
-        print("⏸️ Pausing playback...")
+    def _dispatch_playback(self, command: str) -> str:
+        """Run a playback control command from _PLAYBACK_COMMANDS using AppleScript"""
+        verb, progress, failure, delay, playing_message, fallback_message = _PLAYBACK_COMMANDS[command]
+        print(progress)
         
-        script = 'tell application "Spotify" to pause'
+        script = f'tell application "Spotify" to {verb}'
         result = self.run_applescript(script)
+        self._invalidate_current_track()
         
         if "❌" in result:
-            return f"❌ Failed to pause: {result}"
-        
-        return "⏸️ Playback paused"
-    
-    def resume_playback(self) -> str:
-        """Resume playback using AppleScript"""
-        print("▶️ Resuming playback...")
+            return f"{failure}: {result}"
         
-        script = 'tell application "Spotify" to play'
-        result = self.run_applescript(script)
+        if delay is None:
+            return fallback_message
         
-        if "❌" in result:
-            return f"❌ Failed to resume: {result}"
-        
-        # Get current track info
-        time.sleep(1)
+        # Give it a moment to change state, then get the new track info
+        time.sleep(delay)
         current = self.get_current_track()
         if current.get("status") == "playing":
-            return f"▶️ Resumed: {current['name']} by {current['artist']}"
+            return playing_message.format(name=current['name'], artist=current['artist'])
         else:
-            return "▶️ Playback resumed"
+            return fallback_message.format(status=current.get('status', 'Unknown'))
     
     def get_track_lyrics(self, artist: str, song: str) -> Optional[str]:
         """
         Get lyrics for a song using web APIs with timeout
         """
+        return self._cached_lookup(('lyrics', _normalize_query(artist), _normalize_query(song)),
+                                   lambda: self._get_track_lyrics_uncached(artist, song))
+    
+    def _get_track_lyrics_uncached(self, artist: str, song: str) -> Optional[str]:
+        """Fetch the first lines of a song's lyrics from the lyrics API"""
         print(f"🔍 Getting lyrics for: {song} by {artist}")
         
         try:
@@ -1263,22 +1642,22 @@ class ComprehensiveMusicAgent:
                 except Exception as e:
                     print(f"⚠️  Artist info not available: {e}")
                 
-                # Build analysis
-                analysis = f"🎵 **{track_name}** by **{artist_name}**\n\n"
+                # Build analysis as lines and join once at the end
+                parts = [f"🎵 **{track_name}** by **{artist_name}**", ""]
                 
                 # Add basic track info
-                analysis += f"🎤 **Album**: {track['album']['name']}\n"
+                parts.append(f"🎤 **Album**: {track['album']['name']}")
                 
                 # Add release year if available
                 release_date = track['album']['release_date']
                 if release_date:
                     year = release_date.split('-')[0]
-                    analysis += f"📅 **Released**: {year}\n"
+                    parts.append(f"📅 **Released**: {year}")
                 
                 # Add genres if available and automatically tag them
                 if artist_info and artist_info.get('genres'):
                     genres = artist_info['genres'][:3]  # Top 3 genres
-                    analysis += f"🎸 **Genres**: {', '.join(genres)}\n"
+                    parts.append(f"🎸 **Genres**: {', '.join(genres)}")
                     
                     # Automatically add genre tags to the database
                     tags_added = []
@@ -1290,9 +1669,9 @@ class ComprehensiveMusicAgent:
                             tags_added.append(genre)
                     
                     if tags_added:
-                        analysis += f"🏷️ **Auto-tagged**: {', '.join(tags_added)}\n"
+                        parts.append(f"🏷️ **Auto-tagged**: {', '.join(tags_added)}")
                 else:
-                    analysis += f"⚠️ **Genres**: Not available (API limitations)\n"
+                    parts.append(f"⚠️ **Genres**: Not available (API limitations)")
                 
                 # Add audio characteristics
                 if audio_features:
@@ -1336,16 +1715,16 @@ class ComprehensiveMusicAgent:
                     else:
                         tempo_desc = "slow tempo"
                     
-                    analysis += f"⚡ **Energy**: {energy_desc}\n"
-                    analysis += f"😊 **Mood**: {mood_desc}\n"
-                    analysis += f"💃 **Danceability**: {dance_desc}\n"
-                    analysis += f"🥁 **Tempo**: {tempo_desc} ({int(tempo)} BPM)\n"
+                    parts.append(f"⚡ **Energy**: {energy_desc}")
+                    parts.append(f"😊 **Mood**: {mood_desc}")
+                    parts.append(f"💃 **Danceability**: {dance_desc}")
+                    parts.append(f"🥁 **Tempo**: {tempo_desc} ({int(tempo)} BPM)")
                     
                     # Add release year if available
                     release_date = track['album']['release_date']
                     if release_date:
                         year = release_date.split('-')[0]
-                        analysis += f"📅 **Released**: {year}\n"
+                        parts.append(f"📅 **Released**: {year}")
                 
                 # Suggest some tags based on the analysis
                 suggested_tags = []
@@ -1361,10 +1740,11 @@ class ComprehensiveMusicAgent:
                     if danceability > 0.7:
                         suggested_tags.append("danceable")
                 
+                parts.append("")
                 if suggested_tags:
-                    analysis += f"\n🏷️ **Suggested tags**: {', '.join(suggested_tags)}"
+                    parts.append(f"🏷️ **Suggested tags**: {', '.join(suggested_tags)}")
                 
-                return analysis
+                return "\n".join(parts)
                 
             else:
                 return f"❌ Could not find detailed info for {track_name} by {artist_name}"
@@ -1377,473 +1757,394 @@ class ComprehensiveMusicAgent:
     
     def handle_command(self, command: str) -> str:
         """Handle natural language music commands"""
-        command_lower = command.lower()
-        
-        # Handle "sync" command (analyze current track)
-        if command_lower == "sync":
-            current = self.get_current_track()
-            if current.get("status") == "playing":
-                analysis = self._analyze_current_music(current)
-                return f"🔄 **Manual sync completed**\n\n{analysis}"
-            else:
-                return "❌ No track currently playing to sync"
-        
-        # Handle playback control commands
-        elif "next track" in command_lower or "skip" in command_lower or "next" in command_lower:
-            return self.next_track()
-        
-        elif "previous track" in command_lower or "back" in command_lower or "previous" in command_lower:
-            return self.previous_track()
-        
-        elif "pause" in command_lower:
-            return self.pause_playback()
-        
-        elif "resume" in command_lower or "unpause" in command_lower:
-            return self.resume_playback()
-        
-        # Handle "what's playing"
-        elif "what's playing" in command_lower or "current track" in command_lower:
+        parsed = ParsedCmd.from_command(command)
+        intent = _resolve_intent(parsed)
+        self._count_intent(intent.name if intent else 'UNKNOWN')
+        return self._handlers.get(intent, self._cmd_unknown)(parsed)
+    
+    def _count_intent(self, name: str):
+        """Record one request for an intent"""
+        with self._intent_counts_lock:
+            self.intent_counts[name] += 1
+    
+    def intent_count_snapshot(self) -> Dict[str, int]:
+        """Copy of intent_counts, most requested first"""
+        with self._intent_counts_lock:
+            return dict(self.intent_counts.most_common())
+    
+    def fixed_commands(self) -> Dict[str, Callable[[], str]]:
+        """Map each fixed command string to a callable that runs it without parsing or rule matching"""
+        def bind(intent: Intent, parsed: ParsedCmd) -> Callable[[], str]:
+            handler = self._handlers[intent]
+            def run() -> str:
+                self._count_intent(intent.name)
+                return handler(parsed)
+            return run
+        
+        commands = {}
+        for command in _FIXED_COMMANDS:
+            parsed = ParsedCmd.from_command(command)
+            commands[command] = bind(_resolve_intent(parsed), parsed)
+        return commands
+    
+    def _cmd_sync(self, parsed: ParsedCmd) -> str:
+        """Analyze the current track ("sync")"""
+        current = self.get_current_track()
+        if current.get("status") == "playing":
+            analysis = self._analyze_current_music(current)
+            return f"🔄 **Manual sync completed**\n\n{analysis}"
+        else:
+            return "❌ No track currently playing to sync"
+    
+    def _cmd_now_playing(self, parsed: ParsedCmd) -> str:
+        """Report the current track ("what's playing")"""
+        current = self.get_current_track()
+        if current.get("status") == "playing":
+            return f"🎵 Now playing: {current['name']} by {current['artist']}"
+        else:
+            return f"ℹ️ {current.get('status', 'Unknown status')}"
+    
+    def _cmd_like(self, parsed: ParsedCmd) -> str:
+        """Add an artist to favorites ("like this", "like john hiatt")"""
+        if parsed.has("this"):
+            # Like current playing artist
             current = self.get_current_track()
             if current.get("status") == "playing":
-                return f"🎵 Now playing: {current['name']} by {current['artist']}"
-            else:
-                return f"ℹ️ {current.get('status', 'Unknown status')}"
-        
-        # Handle "like" commands
-        elif "like" in command_lower and ("artist" in command_lower or "this" in command_lower):
-            if "this" in command_lower:
-                # Like current playing artist
-                current = self.get_current_track()
-                if current.get("status") == "playing":
-                    artist_name = current['artist']
-                    success = self.db.add_favorite_artist(artist_name)
-                    if success:
-                        return f"❤️ Added {artist_name} to your favorites!"
-                    else:
-                        return f"ℹ️ {artist_name} is already in your favorites"
-                else:
-                    return "❌ No track currently playing to like"
-            else:
-                # Extract artist name from command
-                # Look for patterns like "like john hiatt" or "I like artist john hiatt"
-                import re
-                patterns = [
-                    r'like\s+(?:artist\s+)?([a-zA-Z\s]+?)(?:\s*$|\s+artist)',
-                    r'i\s+like\s+([a-zA-Z\s]+?)(?:\s*$|\s+artist)',
-                    r'like\s+([a-zA-Z\s]+?)\s*$'
-                ]
-                
-                artist_name = None
-                for pattern in patterns:
-                    match = re.search(pattern, command_lower)
-                    if match:
-                        artist_name = match.group(1).strip()
-                        break
-                
-                if artist_name:
-                    success = self.db.add_favorite_artist(artist_name)
-                    if success:
-                        return f"❤️ Added {artist_name} to your favorites!"
-                    else:
-                        return f"ℹ️ {artist_name} is already in your favorites"
-                else:
-                    return "❌ Could not determine which artist to like. Try 'like john hiatt' or 'I like this artist'"
-        
-        # Handle "favorites" or "show favorites" commands
-        elif "favorites" in command_lower or "favourite" in command_lower:
-            favorites = self.db.get_favorite_artists()
-            if favorites:
-                result = "❤️ Your favorite artists:\n"
-                for i, fav in enumerate(favorites[:10], 1):  # Show top 10
-                    result += f"{i}. {fav['artist']} (played {fav['play_count']} times)\n"
-                return result.strip()
-            else:
-                return "ℹ️ You haven't liked any artists yet. Try 'like john hiatt' or 'I like this artist'"
-        
-        # Handle tagging commands
-        elif "tag this" in command_lower or "add tag" in command_lower:
-            current = self.get_current_track()
-            if current.get("status") != "playing":
-                return "❌ No track currently playing to tag"
-            
-            # Extract tag from command
-            import re
-            patterns = [
-                r'tag this (?:as |with )?"([^"]+)"',  # "tag this as "high energy""
-                r'tag this (?:as |with )?(.+)',        # "tag this as high energy"
-                r'add tag "([^"]+)"',                   # "add tag "high energy""
-                r'add tag (.+)'                        # "add tag high energy"
-            ]
-            
-            tag_text = None
-            for pattern in patterns:
-                match = re.search(pattern, command_lower)
-                if match:
-                    tag_text = match.group(1).strip()
-                    break
-            
-            if not tag_text:
-                return "❌ Could not extract tag. Try 'tag this as high energy' or 'add tag \"workout music\"'"
-            
-            # Determine tag category (mood, genre, energy, etc.)
-            tag_category = 'mood'  # Default
-            energy_words = ['energy', 'energetic', 'pump', 'intense', 'powerful', 'driving']
-            genre_words = ['rock', 'jazz', 'electronic', 'pop', 'classical', 'hip hop', 'country', 'blues', 'metal', 'punk', 'folk']
-            mood_words = ['happy', 'sad', 'mellow', 'chill', 'upbeat', 'relaxing', 'peaceful', 'aggressive', 'romantic', 'nostalgic']
-            
-            if any(word in tag_text.lower() for word in energy_words):
-                tag_category = 'energy'
-            elif any(word in tag_text.lower() for word in genre_words):
-                tag_category = 'genre'
-            elif any(word in tag_text.lower() for word in mood_words):
-                tag_category = 'mood'
-            
-            # Add tag to current track
-            success = self.db.add_tag('track', current['name'], tag_category, tag_text, added_by='user')
-            if success:
-                return f"🏷️ Tagged '{current['name']}' by {current['artist']} as: {tag_text}"
-            else:
-                return f"❌ Failed to add tag"
-        
-        # Handle "show tags" command
-        elif "show tags" in command_lower or "what tags" in command_lower:
-            current = self.get_current_track()
-            if current.get("status") != "playing":
-                return "❌ No track currently playing to show tags for"
-            
-            tags = self.db.get_tags_for_entity('track', current['name'])
-            if tags:
-                result = f"🏷️ Tags for '{current['name']}' by {current['artist']}:\n"
-                for tag in tags:
-                    result += f"  • {tag['category']}: {tag['value']} (added {tag['added_date'][:10]})\n"
-                return result.strip()
-            else:
-                return f"🏷️ No tags found for '{current['name']}' by {current['artist']}"
-        
-        # Handle "find songs tagged" command
-        elif "find songs tagged" in command_lower or "play songs tagged" in command_lower:
-            import re
-            patterns = [
-                r'(?:find|play) songs tagged (?:as |with )?"([^"]+)"',
-                r'(?:find|play) songs tagged (?:as |with )?(.+)'
-            ]
-            
-            tag_text = None
-            for pattern in patterns:
-                match = re.search(pattern, command_lower)
-                if match:
-                    tag_text = match.group(1).strip()
-                    break
-            
-            if not tag_text:
-                return "❌ Could not extract tag. Try 'find songs tagged high energy'"
-            
-            # Search for tracks with this tag
-            tracks = self.db.get_entities_by_tag('mood', tag_text, 'track')
-            if not tracks:
-                tracks = self.db.get_entities_by_tag('energy', tag_text, 'track')
-            if not tracks:
-                tracks = self.db.get_entities_by_tag('genre', tag_text, 'track')
-            
-            if tracks:
-                if "play" in command_lower:
-                    # Play the first/highest confidence track
-                    track = tracks[0]
-                    # Try to find and play the track
-                    found_track = self.search_track_fuzzy(track['entity_name'])
-                    if found_track:
-                        success = self.play_track(found_track['uri'])
-                        if success:
-                            return f"🎵 Playing '{tag_text}' tagged song: {found_track['name']} by {found_track['artist']}"
-                        else:
-                            return f"❌ Failed to play {found_track['name']}"
-                    else:
-                        return f"❌ Could not find track: {track['entity_name']}"
+                artist_name = current['artist']
+                success = self.db.add_favorite_artist(artist_name)
+                if success:
+                    return f"❤️ Added {artist_name} to your favorites!"
                 else:
-                    # Just list the tracks
-                    result = f"🏷️ Songs tagged '{tag_text}':\n"
-                    for i, track in enumerate(tracks[:10], 1):
-                        result += f"{i}. {track['entity_name']} (confidence: {track['confidence']:.1f})\n"
-                    return result.strip()
-            else:
-                return f"❌ No songs found with tag: '{tag_text}'"
-        
-        
-        # Handle "shuffle" commands
-        elif "shuffle" in command_lower and ("liked songs" in command_lower or "my liked" in command_lower):
-            success = self.shuffle_liked_songs()
-            if success:
-                return "🔀 Now shuffling your liked songs!"
+                    return f"ℹ️ {artist_name} is already in your favorites"
             else:
-                return "❌ Could not access your liked songs. Make sure you're authenticated with Spotify."
-        
-        elif "shuffle" in command_lower and "playlist" in command_lower:
-            # Extract playlist name
-            import re
-            patterns = [
-                r'shuffle playlist (.+)',
-                r'shuffle (.+?) playlist',
-                r'shuffle (.+)'
-            ]
-            
-            playlist_name = None
-            for pattern in patterns:
-                match = re.search(pattern, command_lower)
-                if match:
-                    playlist_name = match.group(1).strip()
-                    # Skip words that don't look like playlist names
-                    if playlist_name not in ['playlist', 'the', 'my']:
-                        break
+                return "❌ No track currently playing to like"
+        else:
+            # Extract artist name from command
+            # Look for patterns like "like john hiatt" or "I like artist john hiatt"
+            match = _LIKE_RE.search(parsed.lower)
+            artist_name = match.group('artist').strip() if match else None
             
-            if playlist_name:
-                success = self.shuffle_playlist_by_name(playlist_name)
+            if artist_name:
+                success = self.db.add_favorite_artist(artist_name)
                 if success:
-                    return f"🔀 Now shuffling playlist: {playlist_name}"
+                    return f"❤️ Added {artist_name} to your favorites!"
                 else:
-                    return f"❌ Could not find or shuffle playlist: '{playlist_name}'"
+                    return f"ℹ️ {artist_name} is already in your favorites"
             else:
-                return "❌ Please specify a playlist name. Try 'shuffle my favorites playlist'"
+                return "❌ Could not determine which artist to like. Try 'like john hiatt' or 'I like this artist'"
+    
+    def _cmd_favorites(self, parsed: ParsedCmd) -> str:
+        """List favorite artists"""
+        favorites = self.db.get_favorite_artists()
+        if favorites:
+            parts = ["❤️ Your favorite artists:"]
+            parts.extend(f"{i}. {fav['artist']} (played {fav['play_count']} times)"
+                         for i, fav in enumerate(favorites[:10], 1))  # Show top 10
+            return "\n".join(parts)
+        else:
+            return "ℹ️ You haven't liked any artists yet. Try 'like john hiatt' or 'I like this artist'"
+    
+    def _cmd_tag(self, parsed: ParsedCmd) -> str:
+        """Tag the current track ("tag this as high energy")"""
+        current = self.get_current_track()
+        if current.get("status") != "playing":
+            return "❌ No track currently playing to tag"
         
-        # Handle playlist commands
-        elif "list playlists" in command_lower or "show playlists" in command_lower:
-            return self.list_playlists()
+        # Extract tag from command
+        match = _TAG_RE.search(parsed.lower)
+        tag_text = (match.group('quoted') or match.group('tag')).strip() if match else None
         
-        elif "play playlist" in command_lower or "play the playlist" in command_lower:
-            # Extract playlist name
-            playlist_name = command_lower.replace("play playlist", "").replace("play the playlist", "").strip()
-            if playlist_name:
-                success = self.play_playlist_by_name(playlist_name)
-                if success:
-                    return f"🎵 Now playing playlist: {playlist_name}"
-                else:
-                    return f"❌ Could not find or play playlist: '{playlist_name}'"
-            else:
-                return "❌ Please specify a playlist name. Try 'play playlist my favorites'"
-        
-        elif "random from" in command_lower:
-            # Extract playlist name from various "random from [name]" patterns
-            import re
-            patterns = [
-                r'random from (.+?) playlist',
-                r'random from playlist (.+)',
-                r'play random from (.+?) playlist', 
-                r'play random from playlist (.+)',
-                r'random from (.+)',  # More flexible - just "random from [name]"
-                r'play random from (.+)'
-            ]
-            
-            playlist_name = None
-            for pattern in patterns:
-                match = re.search(pattern, command_lower)
-                if match:
-                    playlist_name = match.group(1).strip()
-                    # Skip if it looks like a tag-based request
-                    if not any(word in playlist_name for word in ['music', 'song', 'track']):
-                        break
-            
-            if playlist_name:
-                success = self.play_random_from_playlist(playlist_name)
-                if success:
-                    return f"🎲 Playing random track from playlist: {playlist_name}"
-                else:
-                    return f"❌ Could not find tracks in playlist: '{playlist_name}'"
-            else:
-                return "❌ Please specify a playlist name. Try 'random from odesza' or 'random from my favorites playlist'"
+        if not tag_text:
+            return "❌ Could not extract tag. Try 'tag this as high energy' or 'add tag \"workout music\"'"
         
-        # Handle "what kind of music is this" or "what genre is this"
-        elif any(phrase in command_lower for phrase in ["what kind of music", "what genre", "what style", "describe this music"]):
-            current = self.get_current_track()
-            if current.get("status") == "playing":
-                return self._analyze_current_music(current)
-            else:
-                return "❌ No track currently playing to analyze"
+        # Determine tag category (mood, genre, energy, etc.)
+        _, tag_category = _classify_keywords(_tokenize(tag_text.lower()), _TAG_WORD_CATEGORY)
+        tag_category = tag_category or 'mood'  # Default
         
-        # Handle lyric search
-        elif "where they say" in command_lower or "lyrics" in command_lower:
-            # Extract the lyric fragment
-            if "where they say" in command_lower:
-                lyric_fragment = command_lower.split("where they say")[1].strip().strip('"\'')
-            else:
-                lyric_fragment = command_lower.replace("lyrics", "").strip()
-            
-            track = self.search_by_lyrics(lyric_fragment)
-            if track:
-                return f"🎯 Found: {track['name']} by {track['artist']}"
-            else:
-                return f"❌ Could not find song with lyrics: '{lyric_fragment}'"
+        # Add tag to current track
+        success = self.db.add_tag('track', current['name'], tag_category, tag_text, added_by='user')
+        if success:
+            return f"🏷️ Tagged '{current['name']}' by {current['artist']} as: {tag_text}"
+        else:
+            return f"❌ Failed to add tag"
+    
+    def _cmd_show_tags(self, parsed: ParsedCmd) -> str:
+        """Show tags for the current track"""
+        current = self.get_current_track()
+        if current.get("status") != "playing":
+            return "❌ No track currently playing to show tags for"
+        
+        tags = self.db.get_tags_for_entity('track', current['name'])
+        if tags:
+            parts = [f"🏷️ Tags for '{current['name']}' by {current['artist']}:"]
+            parts.extend(f"  • {tag['category']}: {tag['value']} (added {tag['added_date'][:10]})"
+                         for tag in tags)
+            return "\n".join(parts)
+        else:
+            return f"🏷️ No tags found for '{current['name']}' by {current['artist']}"
+    
+    def _cmd_find_tagged(self, parsed: ParsedCmd) -> str:
+        """List or play songs with a tag ("find songs tagged mellow")"""
+        match = _FIND_TAG_RE.search(parsed.lower)
+        tag_text = (match.group('quoted') or match.group('tag')).strip() if match else None
         
-        # Handle tag-based requests like "play some mellow music" or "play something rock"
-        elif any(phrase in command_lower for phrase in ["play some", "play something", "i want to hear", "put on some"]) and any(tag in command_lower for tag in ["music", "song", "track"]):
-            # Extract the tag value (mood, genre, etc.)
-            tag_value = None
-            tag_category = None
-            
-            # Common mood/genre words to look for
-            mood_words = ['mellow', 'chill', 'relaxing', 'calm', 'peaceful', 'energetic', 'upbeat', 'sad', 'happy', 'aggressive']
-            genre_words = ['rock', 'jazz', 'classical', 'pop', 'electronic', 'country', 'blues', 'folk', 'metal', 'punk', 'americana', 'roots']
-            tempo_words = ['fast', 'slow', 'medium', 'quick', 'upbeat', 'downtempo']
-            
-            # Check for mood words
-            for word in mood_words:
-                if word in command_lower:
-                    tag_value = word
-                    tag_category = 'mood'
-                    break
-            
-            # Check for genre words if no mood found
-            if not tag_value:
-                for word in genre_words:
-                    if word in command_lower:
-                        tag_value = word
-                        tag_category = 'genre'
-                        break
-            
-            # Check for tempo words if no genre found
-            if not tag_value:
-                for word in tempo_words:
-                    if word in command_lower:
-                        tag_value = word
-                        tag_category = 'tempo'
-                        break
-            
-            if tag_value and tag_category:
-                success = self.play_by_tags(tag_category, tag_value)
-                if success:
-                    return f"🎵 Now playing some {tag_value} music!"
-                else:
-                    return f"❌ Could not find any {tag_value} music. Try adding some tags first!"
-            else:
-                return f"❌ Could not identify the type of music you want. Try being more specific (e.g., 'play some rock music')"
+        if not tag_text:
+            return "❌ Could not extract tag. Try 'find songs tagged high energy'"
         
-        # Handle "play me some [artist]" requests
-        elif "play me some" in command_lower or "play some" in command_lower:
-            # Extract artist name
-            if "play me some" in command_lower:
-                artist_name = command_lower.replace("play me some", "").strip()
-            else:
-                artist_name = command_lower.replace("play some", "").strip()
-            
-            # Skip if this looks like a tag-based request
-            if any(word in artist_name for word in ['music', 'song', 'track']):
-                return f"❌ Could not understand the request. Try 'play some mellow music' or 'play me some Enya'"
-            
-            success = self.play_artist_collection(artist_name)
-            if success:
-                return f"🎵 Now playing some {artist_name}!"
-            else:
-                return f"❌ Could not find collection for: '{artist_name}'"
+        # Search for tracks with this tag
+        tracks = self.db.get_entities_by_tag('mood', tag_text, 'track')
+        if not tracks:
+            tracks = self.db.get_entities_by_tag('energy', tag_text, 'track')
+        if not tracks:
+            tracks = self.db.get_entities_by_tag('genre', tag_text, 'track')
         
-        # Handle regular play requests
-        elif "play" in command_lower and not "playing" in command_lower:
-            query = command_lower.replace("play", "").strip()
-            track = self.search_track_fuzzy(query)
-            
-            if track:
-                if track.get('is_playable', True):
-                    success = self.play_track(track['uri'])
+        if tracks:
+            if parsed.has("play"):
+                # Play the first/highest confidence track
+                track = tracks[0]
+                # Try to find and play the track
+                found_track = self.search_track_fuzzy(track['entity_name'])
+                if found_track:
+                    success = self.play_track(found_track['uri'])
                     if success:
-                        return f"🎵 Now playing: {track['name']} by {track['artist']}"
+                        return f"🎵 Playing '{tag_text}' tagged song: {found_track['name']} by {found_track['artist']}"
                     else:
-                        return f"❌ Failed to play: {track['name']} by {track['artist']}"
+                        return f"❌ Failed to play {found_track['name']}"
                 else:
-                    return f"❌ Track not available for playback: {track['name']} by {track['artist']}"
+                    return f"❌ Could not find track: {track['entity_name']}"
             else:
-                return f"❌ Could not find track: '{query}'"
+                # Just list the tracks
+                parts = [f"🏷️ Songs tagged '{tag_text}':"]
+                parts.extend(f"{i}. {track['entity_name']} (confidence: {track['confidence']:.1f})"
+                             for i, track in enumerate(tracks[:10], 1))
+                return "\n".join(parts)
+        else:
+            return f"❌ No songs found with tag: '{tag_text}'"
+    
+    def _cmd_shuffle_liked(self, parsed: ParsedCmd) -> str:
+        """Shuffle liked songs"""
+        success = self.shuffle_liked_songs()
+        if success:
+            return "🔀 Now shuffling your liked songs!"
+        else:
+            return "❌ Could not access your liked songs. Make sure you're authenticated with Spotify."
+    
+    def _cmd_shuffle_playlist(self, parsed: ParsedCmd) -> str:
+        """Shuffle a playlist by name"""
+        # Extract playlist name
+        playlist_name = None
+        for pattern in _SHUFFLE_PATTERNS:
+            match = pattern.search(parsed.lower)
+            if match:
+                playlist_name = match.group(1).strip()
+                # Skip words that don't look like playlist names
+                if playlist_name not in _NON_PLAYLIST_NAMES:
+                    break
         
-        # Handle search requests
-        elif "search" in command_lower or "find" in command_lower:
-            query = command_lower.replace("search for", "").replace("find", "").strip()
-            track = self.search_track_fuzzy(query)
-            
-            if track:
-                return f"🎵 Found: {track['name']} by {track['artist']} from {track['album']}"
+        if playlist_name:
+            success = self.shuffle_playlist_by_name(playlist_name)
+            if success:
+                return f"🔀 Now shuffling playlist: {playlist_name}"
             else:
-                return f"❌ Could not find: '{query}'"
-        
-        # Handle relationship commands
-        elif "add relationship" in command_lower or "this is" in command_lower:
-            current = self.get_current_track()
-            if current.get("status") != "playing":
-                return "❌ No track currently playing to add relationship for"
-            
-            # Parse relationship patterns
-            import re
-            patterns = [
-                r'this is (?:a )?remix of ([^"]+) by ([^"]+)',
-                r'this is (?:a )?cover of ([^"]+) by ([^"]+)',
-                r'this (?:was )?influenced by ([^"]+) by ([^"]+)',
-                r'add relationship this is remix of ([^"]+) by ([^"]+)',
-                r'add relationship this is cover of ([^"]+) by ([^"]+)',
-            ]
-            
-            relationship_type = None
-            target_name = None
-            target_artist = None
-            
-            for pattern in patterns:
-                match = re.search(pattern, command_lower)
-                if match:
-                    target_name = match.group(1).strip()
-                    target_artist = match.group(2).strip()
-                    
-                    if "remix" in pattern:
-                        relationship_type = "remix_of"
-                    elif "cover" in pattern:
-                        relationship_type = "cover_of"
-                    elif "influenced" in pattern:
-                        relationship_type = "influenced_by"
-                    break
-            
-            if not (relationship_type and target_name and target_artist):
-                return "❌ Could not parse relationship. Try: 'this is remix of sweet home alabama by lynyrd skynyrd'"
-            
-            # Add the relationship
-            success = self.db.add_relationship(
-                source_type='track',
-                source_name=current['name'],
-                source_artist=current['artist'],
-                target_type='track', 
-                target_name=target_name,
-                target_artist=target_artist,
-                relationship_type=relationship_type,
-                notes=f"Added via voice command: {command}"
-            )
-            
+                return f"❌ Could not find or shuffle playlist: '{playlist_name}'"
+        else:
+            return "❌ Please specify a playlist name. Try 'shuffle my favorites playlist'"
+    
+    def _cmd_play_playlist(self, parsed: ParsedCmd) -> str:
+        """Play a playlist by name"""
+        # Extract playlist name; no match means nothing follows "play playlist"
+        match = _PLAY_PLAYLIST_RE.search(parsed.lower)
+        if not match or not match.group('playlist'):
+            return "❌ Please specify a playlist name. Try 'play playlist my favorites'"
+        
+        playlist_name = match.group('playlist')
+        success = self.play_playlist_by_name(playlist_name)
+        if success:
+            return f"🎵 Now playing playlist: {playlist_name}"
+        else:
+            return f"❌ Could not find or play playlist: '{playlist_name}'"
+    
+    def _cmd_random_from(self, parsed: ParsedCmd) -> str:
+        """Play a random track from a playlist ("random from odesza")"""
+        # Extract playlist name from various "random from [name]" patterns
+        match = _RANDOM_FROM_RE.search(parsed.lower)
+        playlist_name = match.group('playlist').strip() if match else None
+        
+        if playlist_name:
+            success = self.play_random_from_playlist(playlist_name)
             if success:
-                return f"🔗 Added relationship: '{current['name']}' by {current['artist']} is {relationship_type.replace('_', ' ')} '{target_name}' by {target_artist}"
+                return f"🎲 Playing random track from playlist: {playlist_name}"
             else:
-                return "❌ Failed to add relationship"
+                return f"❌ Could not find tracks in playlist: '{playlist_name}'"
+        else:
+            return "❌ Please specify a playlist name. Try 'random from odesza' or 'random from my favorites playlist'"
+    
+    def _cmd_analyze(self, parsed: ParsedCmd) -> str:
+        """Describe the current track ("what genre is this")"""
+        current = self.get_current_track()
+        if current.get("status") == "playing":
+            return self._analyze_current_music(current)
+        else:
+            return "❌ No track currently playing to analyze"
+    
+    def _cmd_lyric_search(self, parsed: ParsedCmd) -> str:
+        """Find a song from a lyric fragment ("where they say ...")"""
+        # Extract the lyric fragment
+        if parsed.has("where they say"):
+            lyric_fragment = parsed.lower.split("where they say")[1].strip().strip('"\'')
+        else:
+            lyric_fragment = parsed.lower.replace("lyrics", "").strip()
         
-        # Handle "show relationships" command  
-        elif "show relationships" in command_lower or "what relationships" in command_lower:
-            current = self.get_current_track()
-            if current.get("status") != "playing":
-                return "❌ No track currently playing to show relationships for"
-            
-            relationships = self.db.get_relationships_for_entity('track', current['name'], current['artist'])
-            if relationships:
-                result = f"🔗 Relationships for '{current['name']}' by {current['artist']}:\n"
-                for rel in relationships:
-                    direction = "➡️" if rel['direction'] == 'outgoing' else "⬅️"
-                    result += f"  {direction} {rel['relationship_type'].replace('_', ' ')}: {rel['related_name']} by {rel['related_artist']}\n"
-                return result.strip()
-            else:
-                return f"🔗 No relationships found for '{current['name']}' by {current['artist']}"
+        track = self.search_by_lyrics(lyric_fragment)
+        if track:
+            return f"🎯 Found: {track['name']} by {track['artist']}"
+        else:
+            return f"❌ Could not find song with lyrics: '{lyric_fragment}'"
+    
+    def _cmd_play_tagged(self, parsed: ParsedCmd) -> str:
+        """Play music by tag ("play some mellow music")"""
+        # Extract the tag value, preferring mood words, then genre words, then tempo words
+        tag_value, tag_category = _classify_keywords(parsed.tokens, _PLAY_WORD_CATEGORY)
         
-        # Handle lyrics requests
-        elif "lyrics" in command_lower:
-            # Try to get lyrics for current track
-            current = self.get_current_track()
-            if current.get("status") == "playing":
-                lyrics = self.get_track_lyrics(current['artist'], current['name'])
-                if lyrics:
-                    return f"🎵 First few lines of {current['name']} by {current['artist']}:\n{lyrics}"
+        if tag_value and tag_category:
+            success = self.play_by_tags(tag_category, tag_value)
+            if success:
+                return f"🎵 Now playing some {tag_value} music!"
+            else:
+                return f"❌ Could not find any {tag_value} music. Try adding some tags first!"
+        else:
+            return f"❌ Could not identify the type of music you want. Try being more specific (e.g., 'play some rock music')"
+    
+    def _cmd_play_artist(self, parsed: ParsedCmd) -> str:
+        """Play an artist's collection ("play me some enya")"""
+        # Extract artist name; no match means nothing follows "play some" ("play something")
+        match = _PLAY_SOME_RE.search(parsed.lower)
+        if not match or not match.group('artist'):
+            return "❌ Could not understand the request. Please specify an artist, e.g. 'play me some Enya'"
+        artist_name = match.group('artist')
+        
+        # Skip if this looks like a tag-based request
+        if any(word in artist_name for word in _TAG_REQUEST_WORDS):
+            return f"❌ Could not understand the request. Try 'play some mellow music' or 'play me some Enya'"
+        
+        success = self.play_artist_collection(artist_name)
+        if success:
+            return f"🎵 Now playing some {artist_name}!"
+        else:
+            return f"❌ Could not find collection for: '{artist_name}'"
+    
+    def _cmd_play(self, parsed: ParsedCmd) -> str:
+        """Search for a track and play it"""
+        query = parsed.lower.replace("play", "").strip()
+        track = self.search_track_fuzzy(query)
+        
+        if track:
+            if track.get('is_playable', True):
+                success = self.play_track(track['uri'])
+                if success:
+                    return f"🎵 Now playing: {track['name']} by {track['artist']}"
                 else:
-                    return f"❌ Could not find lyrics for {current['name']} by {current['artist']}"
+                    return f"❌ Failed to play: {track['name']} by {track['artist']}"
             else:
-                return "❌ No track currently playing"
+                return f"❌ Track not available for playback: {track['name']} by {track['artist']}"
+        else:
+            return f"❌ Could not find track: '{query}'"
+    
+    def _cmd_search(self, parsed: ParsedCmd) -> str:
+        """Search for a track without playing it"""
+        query = parsed.lower.replace("search for", "").replace("find", "").strip()
+        track = self.search_track_fuzzy(query)
         
-        return f"❓ I don't understand: '{command}'\n\nTry:\n• play high hopes pink floyd\n• play me some enya\n• next track / skip\n• previous track / back\n• pause / resume\n• what's playing\n• what's that song where they say 'encumbered forever'\n• search for bohemian rhapsody\n• lyrics"
+        if track:
+            return f"🎵 Found: {track['name']} by {track['artist']} from {track['album']}"
+        else:
+            return f"❌ Could not find: '{query}'"
+    
+    def _cmd_add_relationship(self, parsed: ParsedCmd) -> str:
+        """Relate the current track to another ("this is a remix of X by Y")"""
+        current = self.get_current_track()
+        if current.get("status") != "playing":
+            return "❌ No track currently playing to add relationship for"
+        
+        # Parse relationship patterns
+        relationship_type = None
+        target_name = None
+        target_artist = None
+        
+        match = _RELATIONSHIP_RE.search(parsed.lower)
+        if match:
+            relationship_type = _RELATIONSHIP_TYPES[match.group('kind')]
+            target_name = match.group('name').strip()
+            target_artist = match.group('artist').strip()
+        
+        if not (relationship_type and target_name and target_artist):
+            return "❌ Could not parse relationship. Try: 'this is remix of sweet home alabama by lynyrd skynyrd'"
+        
+        # Add the relationship
+        success = self.db.add_relationship(
+            source_type='track',
+            source_name=current['name'],
+            source_artist=current['artist'],
+            target_type='track', 
+            target_name=target_name,
+            target_artist=target_artist,
+            relationship_type=relationship_type,
+            notes=f"Added via voice command: {parsed.raw}"
+        )
+        
+        if success:
+            return f"🔗 Added relationship: '{current['name']}' by {current['artist']} is {relationship_type.replace('_', ' ')} '{target_name}' by {target_artist}"
+        else:
+            return "❌ Failed to add relationship"
+    
+    def _cmd_show_relationships(self, parsed: ParsedCmd) -> str:
+        """Show relationships for the current track"""
+        current = self.get_current_track()
+        if current.get("status") != "playing":
+            return "❌ No track currently playing to show relationships for"
+        
+        relationships = self.db.get_relationships_for_entity('track', current['name'], current['artist'])
+        if relationships:
+            parts = [f"🔗 Relationships for '{current['name']}' by {current['artist']}:"]
+            for rel in relationships:
+                direction = "➡️" if rel['direction'] == 'outgoing' else "⬅️"
+                parts.append(f"  {direction} {rel['relationship_type'].replace('_', ' ')}: {rel['related_name']} by {rel['related_artist']}")
+            return "\n".join(parts)
+        else:
+            return f"🔗 No relationships found for '{current['name']}' by {current['artist']}"
+    
+    def _cmd_lyrics(self, parsed: ParsedCmd) -> str:
+        """Show the first lines of the current track's lyrics"""
+        # Try to get lyrics for current track
+        current = self.get_current_track()
+        if current.get("status") == "playing":
+            lyrics = self.get_track_lyrics(current['artist'], current['name'])
+            if lyrics:
+                return f"🎵 First few lines of {current['name']} by {current['artist']}:\n{lyrics}"
+            else:
+                return f"❌ Could not find lyrics for {current['name']} by {current['artist']}"
+        else:
+            return "❌ No track currently playing"
+    
+    def _cmd_unknown(self, parsed: ParsedCmd) -> str:
+        """Explain the commands the agent understands"""
+        return f"❓ I don't understand: '{parsed.raw}'\n\nTry:\n• play high hopes pink floyd\n• play me some enya\n• next track / skip\n• previous track / back\n• pause / resume\n• what's playing\n• what's that song where they say 'encumbered forever'\n• search for bohemian rhapsody\n• lyrics"
+
+def _make_playback_command(command: str):
+    """Build a thin agent method that dispatches a playback control command"""
+    def playback_command(self) -> str:
+        return self._dispatch_playback(command)
+    
+    playback_command.__name__ = command
+    playback_command.__qualname__ = f"ComprehensiveMusicAgent.{command}"
+    playback_command.__doc__ = f"Send '{_PLAYBACK_COMMANDS[command][0]}' to Spotify using AppleScript"
+    return playback_command
+
+for _command in _PLAYBACK_COMMANDS:
+    setattr(ComprehensiveMusicAgent, _command, _make_playback_command(_command))
+
+# Inputs that end the interactive session
+_EXIT_CMDS = frozenset(('quit', 'exit', 'q'))
 
 def main():
     """Test the comprehensive music agent"""
@@ -1859,19 +2160,22 @@ def main():
     print("• lyrics")
     print("\nType 'quit' to exit\n")
     
-    while True:
-        try:
-            command = input("🎵 > ").strip()
-            if command.lower() in ['quit', 'exit', 'q']:
+    try:
+        while True:
+            try:
+                command = input("🎵 > ").strip()
+                if command.lower() in _EXIT_CMDS:
+                    break
+                
+                if command:
+                    response = agent.handle_command(command)
+                    print(response)
+                    print()
+            except KeyboardInterrupt:
+                print("\n👋 Goodbye!")
                 break
-            
-            if command:
-                response = agent.handle_command(command)
-                print(response)
-                print()
-        except KeyboardInterrupt:
-            print("\n👋 Goodbye!")
-            break
+    finally:
+        agent.db.close()  # Checkpoints the WAL now rather than on the next open
 
 if __name__ == "__main__":
     main()
@@ -4,12 +4,62 @@ Music Client
 Simple client for sending commands to the Music Daemon with auto-start functionality
 """
 
+import os
 import sys
-import json
 import time
-import subprocess
-from pathlib import Path
-from music_daemon import MusicClient, MusicDaemon
+import socket
+from music_daemon import MusicClient, MusicDaemon, socket_address, spawn_detached
+
+# How long to wait for a freshly started daemon to accept connections (seconds)
+DAEMON_START_TIMEOUT = 10.0
+
+# Commands handled by the daemon itself rather than passed to the music agent
+DAEMON_COMMANDS = frozenset(('ping', 'status', 'shutdown'))
+
+def _daemon_accepting(socket_path: str) -> bool:
+    """Check whether the daemon socket accepts connections, without touching the socket file"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        return probe.connect_ex(socket_address(socket_path)) == 0
+
+def _wait_for_daemon(socket_path: str, timeout: float = DAEMON_START_TIMEOUT) -> bool:
+    """Poll the daemon socket with exponential backoff until it is ready or the timeout passes"""
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while time.monotonic() < deadline:
+        if _daemon_accepting(socket_path):
+            return True
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+    return _daemon_accepting(socket_path)
+
+def _spawn_daemon():
+    """
+    Start the daemon in the background
+    Forks this process when possible so the daemon reuses the modules already imported
+    here, otherwise launches a fresh interpreter
+    """
+    if not hasattr(os, 'fork'):
+        spawn_detached()
+        return
+    
+    if os.fork() != 0:
+        return
+    
+    # Child process: detach from the client's session and terminal, then run the daemon
+    try:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        os.close(devnull)
+        # Don't keep the client's sockets and files open for the daemon's lifetime
+        os.closerange(3, os.sysconf('SC_OPEN_MAX'))
+        
+        daemon = MusicDaemon()
+        if not daemon._check_existing_instance():
+            daemon.start()
+    finally:
+        os._exit(0)
 
 def start_daemon_if_needed():
     """Start the music daemon if it's not already running"""
@@ -17,16 +67,9 @@ def start_daemon_if_needed():
     if not daemon.is_running():
         print("🎵 Starting music daemon...")
         # Start daemon in background
-        subprocess.Popen([
-            sys.executable, 
-            str(Path(__file__).parent / "music_daemon.py"), 
-            "--daemon"
-        ])
-        # Wait a moment for it to start
-        time.sleep(2)
-        
-        # Verify it started
-        if daemon.is_running():
+        _spawn_daemon()
+        # Wait until it accepts connections
+        if _wait_for_daemon(daemon.socket_path):
             print("✅ Music daemon started successfully")
             return True
         else:
@@ -58,7 +101,12 @@ def main():
     client = MusicClient()
     
     # Determine command type
-    if command in ['ping', 'status', 'shutdown']:
+    if command == 'ping':
+        if client.ping():
+            response = {'status': 'success', 'message': 'pong'}
+        else:
+            response = {'status': 'error', 'message': 'Daemon did not answer ping'}
+    elif command in DAEMON_COMMANDS:
         response = client.send_command(command)
     else:
         # Assume it's a music command
@@ -11,11 +11,146 @@ import json
 import threading
 import time
 import signal
+import struct
 import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Optional
-import sqlite3
-from datetime import datetime
+
+# orjson encodes straight to bytes and is several times faster; fall back to the stdlib
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _json_loads = json.loads
+
+# Messages are framed with a 4-byte big-endian length so a response is never cut
+# short by a single recv()
+_FRAME_HEADER = struct.Struct('>I')
+FRAME_BUFFER_SIZE = 65536
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# On Linux the socket lives in the abstract namespace: there is no file to stat, chmod or
+# clean up after a crash. Without file permissions, peers are checked to be the same user.
+# This is a stdlib-only platform branch with the filesystem socket as the portable default
+ABSTRACT_SOCKETS = sys.platform == 'linux'
+_PEER_CREDENTIALS = struct.Struct('3i')  # struct ucred: pid, uid, gid
+
+def socket_address(socket_path: str) -> str:
+    """Address to bind or connect to for the configured socket path"""
+    if ABSTRACT_SOCKETS:
+        return '\0' + socket_path
+    return socket_path
+
+def _peer_is_current_user(sock: socket.socket) -> bool:
+    """Whether the process on the other end of a Unix socket runs as this user (Linux only)"""
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _PEER_CREDENTIALS.size)
+    _, uid, _ = _PEER_CREDENTIALS.unpack(credentials)
+    return uid == os.getuid()
+
+# First file descriptor passed by systemd socket activation (SD_LISTEN_FDS_START)
+_LISTEN_FDS_START = 3
+
+def _activated_socket() -> Optional[socket.socket]:
+    """The listening socket handed over by systemd socket activation, if any"""
+    if os.environ.get('LISTEN_PID') != str(os.getpid()) or os.environ.get('LISTEN_FDS') != '1':
+        return None
+    # Don't pass the activation on to any child processes
+    for name in ('LISTEN_PID', 'LISTEN_FDS', 'LISTEN_FDNAMES'):
+        os.environ.pop(name, None)
+    return socket.socket(fileno=_LISTEN_FDS_START)
+
+def spawn_detached(socket_path: str = None) -> subprocess.Popen:
+    """Start the daemon in a new session, detached from this process's terminal"""
+    command = [sys.executable, str(Path(__file__).absolute())]
+    if socket_path:
+        command += ['--socket', socket_path]
+    return subprocess.Popen(command, start_new_session=True, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+# Client connections are served by a fixed pool of reusable threads
+CLIENT_WORKERS = 8
+
+# Seconds a connection may sit idle between messages before the daemon closes it, so
+# persistent clients can't hold every pool thread and starve new connections
+CLIENT_IDLE_TIMEOUT = 5.0
+
+def _now_ms() -> int:
+    """Current time as epoch milliseconds, for response timestamps"""
+    return time.time_ns() // 1_000_000
+
+def _frame(payload: bytes) -> bytes:
+    """Prefix a message with its length"""
+    return _FRAME_HEADER.pack(len(payload)) + payload
+
+def _send_frame(sock: socket.socket, payload: bytes):
+    """Send one length-prefixed message in a single sendall"""
+    sock.sendall(_frame(payload))
+
+# A message consisting of this single byte is a health check, answered with PING_REPLY
+# without any JSON; JSON messages always start with '{'
+PING_REQUEST = b'\x00'
+PING_REPLY = b'\x00'
+
+# Responses that never change, encoded and framed once
+_PING_REPLY_FRAME = _frame(PING_REPLY)
+_PONG_FRAME = _frame(_json_dumps({'status': 'success', 'message': 'pong'}))
+_SHUTDOWN_FRAME = _frame(_json_dumps({'status': 'success', 'message': 'shutting down'}))
+_INVALID_JSON_FRAME = _frame(_json_dumps({'status': 'error', 'message': 'Invalid JSON'}))
+
+class _FrameReader:
+    """
+    Reads length-prefixed messages from a stream socket
+    Each recv takes whatever has arrived, so a message usually needs a single recv_into
+    rather than one for the header and another for the body
+    """
+    
+    def __init__(self, sock: socket.socket, buffer: bytearray):
+        self._sock = sock
+        self._buffer = buffer
+        self._start = 0  # Unread bytes are self._buffer[self._start:self._end]
+        self._end = 0
+    
+    def read(self) -> Optional[bytes]:
+        """Return the next message, or None when the peer closes the connection"""
+        header_size = _FRAME_HEADER.size
+        if not self._fill(header_size):
+            return None
+        length, = _FRAME_HEADER.unpack_from(self._buffer, self._start)
+        if length > MAX_FRAME_SIZE:
+            raise ConnectionError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+        if not self._fill(header_size + length):
+            return None
+        
+        start = self._start + header_size
+        with memoryview(self._buffer) as view:
+            message = bytes(view[start:start + length])  # One copy out of the buffer
+        self._start = start + length
+        if self._start == self._end:
+            self._start = self._end = 0
+        return message
+    
+    def _fill(self, count: int) -> bool:
+        """Buffer at least count unread bytes; returns False if the peer closes first"""
+        while self._end - self._start < count:
+            if self._start + count > len(self._buffer):
+                # Move the unread bytes to the front, growing the buffer if they can't fit
+                pending = self._buffer[self._start:self._end]
+                if count > len(self._buffer):
+                    self._buffer = bytearray(max(count, 2 * len(self._buffer)))
+                self._buffer[:len(pending)] = pending
+                self._start, self._end = 0, len(pending)
+            
+            with memoryview(self._buffer) as view:
+                received = self._sock.recv_into(view[self._end:])
+            if not received:
+                return False
+            self._end += received
+        return True
 
 # Import the existing music agent functionality
 from music_agent import ComprehensiveMusicAgent
@@ -33,16 +168,34 @@ class MusicDaemon:
             socket_path = self.config.socket_path
         
         self.socket_path = socket_path
+        self.socket_address = socket_address(socket_path)
         self.pid_path = self.config.pid_path
         self.running = False
         self.sock = None
+        self._socket_activated = False  # Listening socket owned by systemd, not us
         self.music_agent = None
+        self._music_dispatch = {}  # Fixed command string -> pre-resolved agent handler
         self.db_path = self.config.database_path
         
+        # Daemon-level commands, keyed by command name (music commands are prefixed 'music:')
+        self._handlers = {
+            'ping': self._handle_ping,
+            'status': self._handle_status,
+            'shutdown': self._handle_shutdown,
+        }
+        
+        # Client handling (open sockets are tracked so stop() can unblock their workers)
+        self._pool = ThreadPoolExecutor(max_workers=CLIENT_WORKERS, thread_name_prefix='music-daemon')
+        self._client_sockets = set()
+        self._client_lock = threading.Lock()
+        
         # Auto-sync tracking
         self.auto_sync_enabled = True
-        self.polling_interval = 30  # seconds
+        self.polling_interval = 30  # seconds, longest wait while a track is playing
+        self.idle_polling_interval = 120  # seconds, while nothing is playing
+        self._wake_event = threading.Event()  # Set to cut a polling wait short (stop or new command)
         self.last_known_track = None
+        self._last_track_key = None  # (name, artist) of the last track seen playing, else None
         self.polling_thread = None
         
         # Set up logging
@@ -67,17 +220,17 @@ class MusicDaemon:
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
         
-        self.logger.info(f"Music Daemon initialized - Socket: {self.socket_path}")
+        self.logger.info("Music Daemon initialized - Socket: %s", self.socket_path)
     
     def _write_pid_file(self) -> bool:
         """Write the current process ID to the PID file"""
         try:
             with open(self.pid_path, 'w') as f:
                 f.write(str(os.getpid()))
-            self.logger.info(f"PID file written: {self.pid_path}")
+            self.logger.info("PID file written: %s", self.pid_path)
             return True
         except Exception as e:
-            self.logger.error(f"Failed to write PID file: {e}")
+            self.logger.error("Failed to write PID file: %s", e)
             return False
     
     def _remove_pid_file(self) -> bool:
@@ -85,10 +238,10 @@ class MusicDaemon:
         try:
             if os.path.exists(self.pid_path):
                 os.unlink(self.pid_path)
-                self.logger.info(f"Removed PID file: {self.pid_path}")
+                self.logger.info("Removed PID file: %s", self.pid_path)
             return True
         except Exception as e:
-            self.logger.error(f"Failed to remove PID file: {e}")
+            self.logger.error("Failed to remove PID file: %s", e)
             return False
     
     def _is_process_running(self, pid: int) -> bool:
@@ -109,87 +262,105 @@ class MusicDaemon:
                 pid = int(f.read().strip())
             
             if self._is_process_running(pid):
-                self.logger.warning(f"Another music daemon is already running (PID: {pid})")
+                self.logger.warning("Another music daemon is already running (PID: %s)", pid)
                 return True
             else:
                 # Stale PID file - remove it
-                self.logger.info(f"Removing stale PID file (PID {pid} not running)")
+                self.logger.info("Removing stale PID file (PID %s not running)", pid)
                 self._remove_pid_file()
                 return False
                 
         except (ValueError, IOError) as e:
-            self.logger.warning(f"Invalid PID file, removing: {e}")
+            self.logger.warning("Invalid PID file, removing: %s", e)
             self._remove_pid_file()
             return False
     
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
-        self.logger.info(f"Received signal {signum}, shutting down...")
+        self.logger.info("Received signal %s, shutting down...", signum)
         self.stop()
         sys.exit(0)
     
     def _setup_socket(self) -> bool:
         """Set up the Unix socket for communication"""
         try:
+            # Under systemd socket activation the socket is already bound and listening
+            activated = _activated_socket()
+            if activated:
+                self.sock = activated
+                self._socket_activated = True
+                self.logger.info("Using socket passed by systemd (fd %s)", _LISTEN_FDS_START)
+                return True
+            
             # Remove existing socket if it exists
-            if os.path.exists(self.socket_path):
+            if not ABSTRACT_SOCKETS and os.path.exists(self.socket_path):
                 os.unlink(self.socket_path)
             
             # Create socket
             self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            self.sock.bind(self.socket_path)
+            self.sock.bind(self.socket_address)
             self.sock.listen(5)
             
             # Set permissions so user can access
-            os.chmod(self.socket_path, 0o600)
+            if not ABSTRACT_SOCKETS:
+                os.chmod(self.socket_path, 0o600)
             
-            self.logger.info(f"Socket created at {self.socket_path}")
+            self.logger.info("Socket created at %s", self.socket_path)
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to set up socket: {e}")
+            self.logger.error("Failed to set up socket: %s", e)
             return False
     
     def _init_music_agent(self) -> bool:
         """Initialize the music agent"""
         try:
             self.music_agent = ComprehensiveMusicAgent(self.db_path)
+            self._music_dispatch = self.music_agent.fixed_commands()
             self.logger.info("Music agent initialized successfully")
             return True
         except Exception as e:
-            self.logger.error(f"Failed to initialize music agent: {e}")
+            self.logger.error("Failed to initialize music agent: %s", e)
             return False
     
     def _handle_client(self, client_socket: socket.socket, client_address: str):
         """Handle a client connection"""
+        with self._client_lock:
+            self._client_sockets.add(client_socket)
         try:
-            self.logger.info(f"Client connected: {client_address}")
+            self.logger.info("Client connected: %s", client_address)
             
+            client_socket.settimeout(CLIENT_IDLE_TIMEOUT)
+            reader = _FrameReader(client_socket, bytearray(FRAME_BUFFER_SIZE))
             while True:
-                # Receive command
-                data = client_socket.recv(4096)
-                if not data:
+                # Receive command; an idle client is disconnected to free the worker
+                try:
+                    data = reader.read()
+                except socket.timeout:
+                    self.logger.info("Closing idle client connection")
                     break
+                if data is None:
+                    break
+                if data == PING_REQUEST:
+                    client_socket.sendall(_PING_REPLY_FRAME)
+                    continue
                 
                 try:
                     # Parse JSON command
-                    command_data = json.loads(data.decode('utf-8'))
+                    command_data = _json_loads(data)
                     command = command_data.get('command', '')
                     
-                    self.logger.info(f"Received command: {command}")
+                    self.logger.info("Received command: %s", command)
+                    
+                    # Daemon commands respond themselves and say whether to keep the connection
+                    handler = self._handlers.get(command)
+                    if handler is not None:
+                        if not handler(client_socket):
+                            break
+                        continue
                     
                     # Process command
-                    if command == 'ping':
-                        response = {'status': 'success', 'message': 'pong'}
-                    elif command == 'status':
-                        response = self._get_status()
-                    elif command == 'shutdown':
-                        response = {'status': 'success', 'message': 'shutting down'}
-                        client_socket.send(json.dumps(response).encode('utf-8'))
-                        client_socket.close()
-                        self.stop()
-                        break
-                    elif command.startswith('music:'):
+                    if command.startswith('music:'):
                         # Handle music commands
                         music_command = command[6:]  # Remove 'music:' prefix
                         
@@ -202,39 +373,61 @@ class MusicDaemon:
                         response = {'status': 'error', 'message': f'Unknown command: {command}'}
                     
                     # Send response
-                    client_socket.send(json.dumps(response).encode('utf-8'))
+                    _send_frame(client_socket, _json_dumps(response))
                     
                 except json.JSONDecodeError:
-                    error_response = {'status': 'error', 'message': 'Invalid JSON'}
-                    client_socket.send(json.dumps(error_response).encode('utf-8'))
+                    client_socket.sendall(_INVALID_JSON_FRAME)
                 except Exception as e:
                     error_response = {'status': 'error', 'message': str(e)}
-                    client_socket.send(json.dumps(error_response).encode('utf-8'))
-                    self.logger.error(f"Error handling command: {e}")
+                    _send_frame(client_socket, _json_dumps(error_response))
+                    self.logger.error("Error handling command: %s", e)
         
         except Exception as e:
-            self.logger.error(f"Error handling client: {e}")
+            self.logger.error("Error handling client: %s", e)
         finally:
+            with self._client_lock:
+                self._client_sockets.discard(client_socket)
             client_socket.close()
             self.logger.info("Client disconnected")
     
+    def _handle_ping(self, client_socket: socket.socket) -> bool:
+        """Answer a health check"""
+        client_socket.sendall(_PONG_FRAME)
+        return True
+    
+    def _handle_status(self, client_socket: socket.socket) -> bool:
+        """Send the daemon status"""
+        _send_frame(client_socket, _json_dumps(self._get_status()))
+        return True
+    
+    def _handle_shutdown(self, client_socket: socket.socket) -> bool:
+        """Acknowledge, close the connection and stop the daemon"""
+        client_socket.sendall(_SHUTDOWN_FRAME)
+        client_socket.close()
+        self.stop()
+        return False
+    
     def _handle_music_command(self, command: str) -> Dict[str, Any]:
         """Handle music-specific commands"""
         try:
             if not self.music_agent:
                 return {'status': 'error', 'message': 'Music agent not initialized'}
             
-            # Use the existing music agent's handle_command method
-            result = self.music_agent.handle_command(command)
+            # Fixed commands skip parsing; anything else goes through handle_command
+            handler = self._music_dispatch.get(command)
+            result = handler() if handler else self.music_agent.handle_command(command)
+            
+            # The command may have changed what's playing, so poll for it now
+            self._wake_event.set()
             
             return {
                 'status': 'success',
                 'message': result,
-                'timestamp': datetime.now().isoformat()
+                'timestamp_ms': _now_ms()
             }
             
         except Exception as e:
-            self.logger.error(f"Error handling music command '{command}': {e}")
+            self.logger.error("Error handling music command '%s': %s", command, e)
             return {'status': 'error', 'message': str(e)}
     
     def _get_status(self) -> Dict[str, Any]:
@@ -250,9 +443,10 @@ class MusicDaemon:
                 'daemon_running': self.running,
                 'music_agent_ready': self.music_agent is not None,
                 'current_track': current_track,
+                'intent_counts': self.music_agent.intent_count_snapshot() if self.music_agent else {},
                 'socket_path': self.socket_path,
                 'db_path': self.db_path,
-                'timestamp': datetime.now().isoformat()
+                'timestamp_ms': _now_ms()
             }
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
@@ -290,17 +484,17 @@ class MusicDaemon:
                 try:
                     client_socket, client_address = self.sock.accept()
                     
-                    # Handle client in a separate thread
-                    client_thread = threading.Thread(
-                        target=self._handle_client,
-                        args=(client_socket, client_address)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
+                    if ABSTRACT_SOCKETS and not _peer_is_current_user(client_socket):
+                        self.logger.warning("Rejected connection from another user")
+                        client_socket.close()
+                        continue
+                    
+                    # Handle client on a pooled worker thread
+                    self._pool.submit(self._handle_client, client_socket, client_address)
                     
                 except Exception as e:
                     if self.running:  # Only log if we're still supposed to be running
-                        self.logger.error(f"Error accepting connection: {e}")
+                        self.logger.error("Error accepting connection: %s", e)
                     break
                     
         except KeyboardInterrupt:
@@ -315,25 +509,48 @@ class MusicDaemon:
         self.logger.info("Stopping Music Daemon...")
         
         self.running = False
+        self._wake_event.set()
         
-        # Close socket
+        # Close socket (shutting it down first wakes an accept() blocked in the main loop,
+        # which would otherwise keep an abstract socket bound)
         if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             try:
                 self.sock.close()
             except:
                 pass
         
+        # Stop taking queued clients and wake workers blocked reading from open ones
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._client_lock:
+            for client_socket in self._client_sockets:
+                try:
+                    client_socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        
         # Remove socket file
-        if os.path.exists(self.socket_path):
+        if not ABSTRACT_SOCKETS and not self._socket_activated and os.path.exists(self.socket_path):
             try:
                 os.unlink(self.socket_path)
-                self.logger.info(f"Removed socket file: {self.socket_path}")
+                self.logger.info("Removed socket file: %s", self.socket_path)
             except:
                 pass
         
         # Remove PID file
         self._remove_pid_file()
         
+        # Close the database once in-flight queries finish, checkpointing the WAL now
+        # rather than leaving it for the next open
+        if self.music_agent:
+            self.music_agent.db.close()
+        
+        if self.music_agent and self.music_agent.intent_counts and self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Command intents this run: %s", self.music_agent.intent_count_snapshot())
+        
         self.logger.info("Music Daemon stopped")
     
     def _start_auto_sync_polling(self):
@@ -343,7 +560,8 @@ class MusicDaemon:
         
         self.polling_thread = threading.Thread(target=self._polling_loop, daemon=True)
         self.polling_thread.start()
-        self.logger.info(f"Auto-sync polling started (interval: {self.polling_interval}s)")
+        self.logger.info("Auto-sync polling started (interval: up to %ss playing, %ss idle)",
+                         self.polling_interval, self.idle_polling_interval)
     
     def _polling_loop(self):
         """Background polling loop to detect track changes"""
@@ -358,27 +576,46 @@ class MusicDaemon:
                         self._handle_track_change(current)
                     
                     self.last_known_track = current
+                    self._last_track_key = self._track_key(current)
                 
-                # Sleep for the polling interval
-                time.sleep(self.polling_interval)
+                delay = self._next_poll_delay(current if self.music_agent else None)
                 
             except Exception as e:
-                self.logger.error(f"Error in polling loop: {e}")
-                time.sleep(self.polling_interval)  # Continue polling even on error
+                self.logger.error("Error in polling loop: %s", e)
+                delay = self.polling_interval  # Continue polling even on error
+            
+            # Wait until the track should have changed, or until stopped or woken by a command
+            self._wake_event.wait(delay)
+            self._wake_event.clear()
     
-    def _has_track_changed(self, current_track: Dict[str, str]) -> bool:
-        """Check if the current track is different from the last known track"""
+    def _next_poll_delay(self, current_track: Optional[Dict[str, Any]]) -> float:
+        """Seconds until the next poll: just past the end of the playing track, capped by the interval"""
         if not current_track or current_track.get('status') != 'playing':
-            return False
+            return self.idle_polling_interval
         
-        if not self.last_known_track or self.last_known_track.get('status') != 'playing':
-            return True  # Started playing something
+        duration_ms = current_track.get('duration_ms')
+        progress_ms = current_track.get('progress_ms')
+        if duration_ms is None or progress_ms is None:
+            return self.polling_interval
         
-        # Compare track name and artist
-        current_key = f"{current_track.get('name', '')}-{current_track.get('artist', '')}"
-        last_key = f"{self.last_known_track.get('name', '')}-{self.last_known_track.get('artist', '')}"
+        remaining = (duration_ms - progress_ms) / 1000 + 1.0  # Let the next track start
+        return min(max(remaining, 1.0), self.polling_interval)
+    
+    def _has_track_changed(self, current_track: Dict[str, str]) -> bool:
+        """Check if the current track is different from the last known track"""
+        current_key = self._track_key(current_track)
+        if current_key is None:
+            return False
         
-        return current_key != last_key
+        # Also true when nothing was playing before (last key is None)
+        return current_key != self._last_track_key
+    
+    @staticmethod
+    def _track_key(track: Optional[Dict[str, str]]) -> Optional[tuple]:
+        """(name, artist) identifying a playing track, or None if nothing is playing"""
+        if not track or track.get('status') != 'playing':
+            return None
+        return (track.get('name', ''), track.get('artist', ''))
     
     def _handle_track_change(self, current_track: Dict[str, str]):
         """Handle when a track change is detected"""
@@ -388,17 +625,17 @@ class MusicDaemon:
         track_name = current_track.get('name', 'Unknown')
         artist_name = current_track.get('artist', 'Unknown')
         
-        self.logger.info(f"Track change detected: {track_name} by {artist_name}")
+        self.logger.info("Track change detected: %s by %s", track_name, artist_name)
         
         try:
             # Auto-analyze the new track
             analysis_result = self.music_agent._analyze_current_music(current_track)
             
             # Log the auto-sync
-            self.logger.info(f"Auto-synced tags for: {artist_name}")
+            self.logger.info("Auto-synced tags for: %s", artist_name)
             
         except Exception as e:
-            self.logger.error(f"Error auto-syncing track {track_name} by {artist_name}: {e}")
+            self.logger.error("Error auto-syncing track %s by %s: %s", track_name, artist_name, e)
     
     def _manual_sync(self) -> Dict[str, Any]:
         """Manually sync the current track (for 'sync' command)"""
@@ -413,10 +650,13 @@ class MusicDaemon:
             # Force analysis regardless of whether it's changed
             result = self.music_agent._analyze_current_music(current)
             
+            # A sync is the user asking for fresh data, so drop remembered searches too
+            self.music_agent.clear_search_cache()
+            
             return {
                 'status': 'success',
                 'message': f"Manual sync completed\n{result}",
-                'timestamp': datetime.now().isoformat()
+                'timestamp_ms': _now_ms()
             }
             
         except Exception as e:
@@ -424,35 +664,66 @@ class MusicDaemon:
     
     def is_running(self) -> bool:
         """Check if another instance is already running"""
-        if not os.path.exists(self.socket_path):
+        if not ABSTRACT_SOCKETS and not os.path.exists(self.socket_path):
             return False
         
         try:
             test_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            test_sock.connect(self.socket_path)
+            test_sock.connect(self.socket_address)
             test_sock.close()
             return True
         except:
             # Socket file exists but no daemon is listening
-            os.unlink(self.socket_path)
+            if not ABSTRACT_SOCKETS:
+                os.unlink(self.socket_path)
             return False
 
 
+_USAGE = """usage: music_daemon.py [-h] [--socket SOCKET] [--daemon] [--stop] [--status]
+
+Music Agent Daemon
+
+options:
+  -h, --help       show this help message and exit
+  --socket SOCKET  Socket path
+  --daemon         Run as daemon (detached)
+  --stop           Stop running daemon
+  --status         Get daemon status"""
+
+
+def _usage_error(message: str):
+    """Report a command line error the way argparse would and exit"""
+    print(f"{_USAGE}\nmusic_daemon.py: error: {message}", file=sys.stderr)
+    sys.exit(2)
+
+
+def _parse_args(argv: list) -> Dict[str, Any]:
+    """Parse the command line by hand; importing argparse costs more than the daemon's four flags"""
+    args = {'socket': None, 'daemon': False, 'stop': False, 'status': False}
+    argv = iter(argv)
+    for arg in argv:
+        if arg in ('-h', '--help'):
+            print(_USAGE)
+            sys.exit(0)
+        elif arg == '--socket' or arg.startswith('--socket='):
+            value = arg.partition('=')[2] if '=' in arg else next(argv, None)
+            if value is None:
+                _usage_error("argument --socket: expected one argument")
+            args['socket'] = value
+        elif arg in ('--daemon', '--stop', '--status'):
+            args[arg[2:]] = True
+        else:
+            _usage_error(f"unrecognized arguments: {arg}")
+    return args
+
+
 def main():
     """Main entry point"""
-    import argparse
-    
-    parser = argparse.ArgumentParser(description='Music Agent Daemon')
-    parser.add_argument('--socket', default=None, help='Socket path')
-    parser.add_argument('--daemon', action='store_true', help='Run as daemon (detached)')
-    parser.add_argument('--stop', action='store_true', help='Stop running daemon')
-    parser.add_argument('--status', action='store_true', help='Get daemon status')
+    args = _parse_args(sys.argv[1:])
     
-    args = parser.parse_args()
+    daemon = MusicDaemon(args['socket'])
     
-    daemon = MusicDaemon(args.socket)
-    
-    if args.stop:
+    if args['stop']:
         # Send shutdown command to running daemon
         if daemon.is_running():
             try:
@@ -465,7 +736,7 @@ def main():
             print("Daemon is not running")
         return
     
-    if args.status:
+    if args['status']:
         # Get status from running daemon
         if daemon.is_running():
             try:
@@ -483,15 +754,10 @@ def main():
         print("Music daemon is already running")
         return
     
-    if args.daemon:
-        # Run as daemon (detached process)
-        if os.fork() == 0:
-            # Child process
-            os.setsid()
-            daemon.start()
-        else:
-            # Parent process
-            print("Music daemon started in background")
+    if args['daemon']:
+        # Run as daemon: a fresh foreground daemon process in its own session
+        spawn_detached(args['socket'])
+        print("Music daemon started in background")
     else:
         # Run in foreground
         daemon.start()
@@ -500,30 +766,81 @@ def main():
 class MusicClient:
     """
     Client for communicating with the Music Daemon
+    Use as a context manager to send several commands over one connection
     """
     
     def __init__(self, socket_path: str = None):
         if socket_path is None:
             socket_path = get_config().socket_path
         self.socket_path = socket_path
+        self.socket_address = socket_address(socket_path)
+        self._buffer = bytearray(FRAME_BUFFER_SIZE)
+        self._sock = None  # Persistent connection while used as a context manager
+        self._reader = None
+    
+    def __enter__(self) -> 'MusicClient':
+        self._sock = self._connect()
+        self._reader = _FrameReader(self._sock, self._buffer)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Close the persistent connection, if open"""
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+            self._reader = None
+    
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_address)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+    
+    def _exchange(self, payload: bytes) -> bytes:
+        """Send one message and return the daemon's reply"""
+        if self._sock:
+            try:
+                return self._exchange_on(self._sock, self._reader, payload)
+            except ConnectionError:
+                # The daemon closes connections left idle for CLIENT_IDLE_TIMEOUT before
+                # reading anything more from them, so the message is safe to resend
+                self.close()
+                self.__enter__()
+                return self._exchange_on(self._sock, self._reader, payload)
+        
+        sock = self._connect()
+        try:
+            return self._exchange_on(sock, _FrameReader(sock, self._buffer), payload)
+        finally:
+            sock.close()
+    
+    @staticmethod
+    def _exchange_on(sock: socket.socket, reader: _FrameReader, payload: bytes) -> bytes:
+        """Send one message over an open connection and read the reply"""
+        _send_frame(sock, payload)
+        reply = reader.read()
+        if reply is None:
+            raise ConnectionError("Daemon closed the connection without responding")
+        return reply
+    
+    def ping(self) -> bool:
+        """Check that the daemon is alive, using the one-byte ping instead of JSON"""
+        try:
+            return self._exchange(PING_REQUEST) == PING_REPLY
+        except Exception:
+            return False
     
     def send_command(self, command: str) -> Dict[str, Any]:
         """Send a command to the daemon"""
         try:
-            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            sock.connect(self.socket_path)
-            
-            # Send command
             command_data = {'command': command}
-            sock.send(json.dumps(command_data).encode('utf-8'))
-            
-            # Receive response
-            response_data = sock.recv(4096)
-            response = json.loads(response_data.decode('utf-8'))
-            
-            sock.close()
-            return response
-            
+            return _json_loads(self._exchange(_json_dumps(command_data)))
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
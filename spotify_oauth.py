@@ -5,45 +5,59 @@ Handles the OAuth flow for the music agent to get full API access
 """
 
 import os
+import re
+import time
 import spotipy
+from functools import cached_property, lru_cache
 from spotipy.oauth2 import SpotifyOAuth
 import json
-from pathlib import Path
 from config import get_config
 
+DEFAULT_REDIRECT_URI = "https://127.0.0.1:8888/callback"
+
+# KEY=VALUE lines in .spotify_credentials (comment lines start with '#' and never match)
+_CREDENTIAL_RE = re.compile(rb'^[ \t]*(SPOTIFY_[A-Z_]+)[ \t]*=(.*)$', re.MULTILINE)
+
+# How long a successful check_auth_status() is trusted before asking Spotify again
+AUTH_CHECK_TTL = 300
+
+@lru_cache(maxsize=1)
+def _read_credentials_file(path: str):
+    """Raw contents of the credentials file, or None if it doesn't exist; read once per process"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
 class SpotifyAuth:
     """Handle Spotify OAuth authentication"""
     
     def __init__(self, cache_path: str = None):
         if cache_path is None:
-            cache_path = str(Path.home() / ".spotify_token_cache")
+            cache_path = os.path.expanduser("~/.spotify_token_cache")
         
         self.cache_path = cache_path
+        self._auth_cache = None  # (monotonic time, is_valid, message) of the last successful check
         self._load_credentials()
         
     def _load_credentials(self):
         """Load credentials from file or environment variables"""
         # Try to load from .spotify_credentials file first
         config = get_config()
-        creds_file = Path(config.credentials_file)
+        data = _read_credentials_file(config.credentials_file)
         
-        if creds_file.exists():
-            with open(creds_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        key, value = line.split('=', 1)
-                        if key == 'SPOTIFY_CLIENT_ID':
-                            self.client_id = value
-                        elif key == 'SPOTIFY_CLIENT_SECRET':
-                            self.client_secret = value
-                        elif key == 'SPOTIFY_REDIRECT_URI':
-                            self.redirect_uri = value
+        if data is not None:
+            credentials = {match.group(1).decode(): match.group(2).decode().strip()
+                           for match in _CREDENTIAL_RE.finditer(data)}
+            self.client_id = credentials.get('SPOTIFY_CLIENT_ID')
+            self.client_secret = credentials.get('SPOTIFY_CLIENT_SECRET')
+            self.redirect_uri = credentials.get('SPOTIFY_REDIRECT_URI', DEFAULT_REDIRECT_URI)
         else:
             # Fallback to environment variables
             self.client_id = os.getenv('SPOTIFY_CLIENT_ID')
             self.client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
-            self.redirect_uri = "https://127.0.0.1:8888/callback"
+            self.redirect_uri = DEFAULT_REDIRECT_URI
         
         # Scopes we need for full functionality
         self.scopes = [
@@ -59,8 +73,9 @@ class SpotifyAuth:
         
         self.scope_string = ' '.join(self.scopes)
     
-    def get_auth_manager(self):
-        """Get SpotifyOAuth manager"""
+    @cached_property
+    def auth_manager(self):
+        """SpotifyOAuth manager, created once and reused"""
         if not self.client_id or not self.client_secret:
             raise ValueError("SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET must be set")
         
@@ -73,22 +88,25 @@ class SpotifyAuth:
             show_dialog=True  # Always show authorization dialog
         )
     
-    def get_spotify_client(self):
-        """Get authenticated Spotify client"""
-        auth_manager = self.get_auth_manager()
-        return spotipy.Spotify(auth_manager=auth_manager)
+    @cached_property
+    def spotify_client(self):
+        """Authenticated Spotify client, created once and reused"""
+        return spotipy.Spotify(auth_manager=self.auth_manager)
     
     def check_auth_status(self):
         """Check if we have valid authentication"""
+        if self._auth_cache and time.monotonic() - self._auth_cache[0] < AUTH_CHECK_TTL:
+            return self._auth_cache[1:]
+        
         try:
-            auth_manager = self.get_auth_manager()
-            token_info = auth_manager.get_cached_token()
+            token_info = self.auth_manager.get_cached_token()
             
             if token_info:
                 # Try to use the token
-                sp = spotipy.Spotify(auth_manager=auth_manager)
-                user = sp.current_user()
-                return True, f"✅ Authenticated as: {user.get('display_name', user['id'])}"
+                user = self.spotify_client.current_user()
+                message = f"✅ Authenticated as: {user.get('display_name', user['id'])}"
+                self._auth_cache = (time.monotonic(), True, message)
+                return True, message
             else:
                 return False, "❌ No valid token found"
                 
@@ -103,11 +121,8 @@ class SpotifyAuth:
         print("")
         
         try:
-            auth_manager = self.get_auth_manager()
-            sp = spotipy.Spotify(auth_manager=auth_manager)
-            
             # This will trigger the OAuth flow
-            user = sp.current_user()
+            user = self.spotify_client.current_user()
             print(f"✅ Authentication successful!")
             print(f"👤 Logged in as: {user.get('display_name', user['id'])}")
             print(f"💾 Token cached at: {self.cache_path}")
@@ -120,6 +135,11 @@ class SpotifyAuth:
     
     def clear_cache(self):
         """Clear cached token"""
+        # Drop the cached manager and client so the next use re-reads the token cache
+        self.__dict__.pop('auth_manager', None)
+        self.__dict__.pop('spotify_client', None)
+        self._auth_cache = None
+        
         if os.path.exists(self.cache_path):
             os.remove(self.cache_path)
             print(f"🗑️  Cleared cached token: {self.cache_path}")
@@ -168,7 +188,7 @@ def main():
         
     elif command == 'test':
         try:
-            sp = auth.get_spotify_client()
+            sp = auth.spotify_client
             
             # Test basic user info
             user = sp.current_user()
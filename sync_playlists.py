@@ -7,20 +7,77 @@ Fetches all user playlists from Spotify and stores them locally
 try:
     from spotify_oauth import SpotifyAuth
     from music_agent import MusicDatabase
+    from spotipy import SpotifyException
 except ImportError as e:
     print(f"❌ Import error: {e}")
     exit(1)
 
 import time
 import sys
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+# Largest pages Spotify returns for the user's playlists and a playlist's tracks
+PLAYLISTS_PAGE_SIZE = 50
+TRACKS_PAGE_SIZE = 100
+
+# Only what store_playlist(s), store_playlist_tracks and the paginator read; full track objects carry
+# available_markets, images and URLs that are most of each response
+PLAYLIST_FIELDS = 'id,name,description,owner(id,display_name),public,collaborative,tracks.total,uri,snapshot_id'
+TRACK_PAGE_FIELDS = 'items(added_at,track(id,name,uri,duration_ms,artists(name),album(name))),total,limit'
+
+# Concurrent page requests; the calls are network-bound, so threads overlap their latency
+FETCH_WORKERS = 8
+
+# Transient failures (rate limiting, server errors) are retried with exponential backoff
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_ATTEMPTS = 5
+
+# Seconds between redraws of the progress line, so a long sync isn't thousands of writes
+PROGRESS_INTERVAL = 0.1
+
+# Default pace for Spotify API calls, well inside its rolling rate limit
+REQUESTS_PER_MINUTE = 600
+
+class RateLimiter:
+    """
+    Leaky bucket of max_rate calls that drains over time_period (thread-safe)
+    A burst of up to max_rate calls goes at once; after that, calls are spaced
+    time_period / max_rate apart
+    """
+    
+    def __init__(self, max_rate, time_period=60.0):
+        self.time_period = time_period
+        self.interval = time_period / max_rate
+        self._drained_at = 0.0  # When the bucket will be empty again
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until the bucket has room for one more call"""
+        with self._lock:
+            now = time.monotonic()
+            drained_at = max(self._drained_at, now)
+            self._drained_at = drained_at + self.interval
+        delay = drained_at + self.interval - self.time_period - now
+        if delay > 0:
+            time.sleep(delay)
 
 class PlaylistSyncer:
     """Handles syncing playlists from Spotify to local database"""
     
-    def __init__(self):
+    def __init__(self, max_connections=FETCH_WORKERS, requests_per_minute=REQUESTS_PER_MINUTE):
         self.sp = None
         self.db = MusicDatabase()
+        # Playlists sync on their own pool: their tasks wait on page fetches, so sharing
+        # one pool could leave every worker waiting and none fetching
+        self._pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='spotify-fetch')
+        self._playlist_pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='playlist-sync')
+        self._connections = threading.BoundedSemaphore(max_connections)  # Caps calls in flight across both
+        self._limiter = RateLimiter(requests_per_minute)
         self.setup_spotify_connection()
+        self._size_connection_pool(max_connections)
     
     def setup_spotify_connection(self):
         """Set up Spotify API connection"""
@@ -28,7 +85,7 @@ class PlaylistSyncer:
             auth = SpotifyAuth()
             is_valid, message = auth.check_auth_status()
             if is_valid:
-                self.sp = auth.get_spotify_client()
+                self.sp = auth.spotify_client
                 print("✅ Spotify OAuth connection established")
             else:
                 print(f"❌ {message}")
@@ -37,15 +94,64 @@ class PlaylistSyncer:
             print(f"❌ Error setting up Spotify connection: {e}")
             exit(1)
     
+    def _size_connection_pool(self, max_connections):
+        """
+        Widen the client's keep-alive pool when max_connections exceeds requests'
+        DEFAULT_POOLSIZE (10) connections per host; beyond that, each extra concurrent call
+        would open (and TLS-handshake) a connection that's discarded afterwards
+        Does nothing at the default FETCH_WORKERS; otherwise it reaches into spotipy's
+        (private) _session, and leaves it alone if that isn't a requests.Session
+        """
+        if max_connections <= requests.adapters.DEFAULT_POOLSIZE:
+            return
+        session = getattr(self.sp, '_session', None)
+        if not isinstance(session, requests.Session):
+            return
+        # Keep spotipy's retry policy on the replacement adapter
+        retries = session.get_adapter('https://api.spotify.com').max_retries
+        session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=max_connections, max_retries=retries))
+    
+    def _api(self, method, *args, **kwargs):
+        """
+        Call a Spotify client method once a connection slot is free and the rate limiter allows it
+        Rate limiting, server errors and dropped connections are retried, waiting 1, 2, 4... seconds
+        or as long as Spotify's Retry-After asks; other errors are raised straight away
+        """
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                with self._connections:
+                    self._limiter.acquire()
+                    return method(*args, **kwargs)
+            except (SpotifyException, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                if isinstance(e, SpotifyException) and e.http_status not in RETRY_STATUSES:
+                    raise
+                retry_after = float((getattr(e, 'headers', None) or {}).get('Retry-After', 0))
+                time.sleep(max(2 ** attempt, retry_after))
+    
     def get_user_id(self):
         """Get the current user's Spotify ID"""
         try:
-            user = self.sp.current_user()
+            user = self._api(self.sp.current_user)
             return user['id']
         except Exception as e:
             print(f"❌ Error getting user ID: {e}")
             return None
     
+    def _fetch_all_pages(self, fetch, limit):
+        """
+        Return every item of a paginated Spotify endpoint
+        The first page gives the total, then the remaining offsets are requested concurrently
+        """
+        first = self._api(fetch, limit=limit, offset=0)
+        items = list(first['items'])
+        page_size = first['limit'] or limit
+        offsets = range(page_size, first['total'], page_size)
+        for page in self._pool.map(lambda offset: self._api(fetch, limit=page_size, offset=offset), offsets):
+            items.extend(page['items'])
+        return items
+    
     def sync_all_playlists(self, include_tracks=True):
         """Sync all user playlists"""
         print("🔄 Starting playlist sync...")
@@ -56,39 +162,56 @@ class PlaylistSyncer:
         
         try:
             # Get all playlists (paginated)
-            playlists = []
-            results = self.sp.current_user_playlists(limit=50)
-            
-            while results:
-                playlists.extend(results['items'])
-                if results['next']:
-                    results = self.sp.next(results)
-                else:
-                    break
+            playlists = self._fetch_all_pages(self.sp.current_user_playlists, PLAYLISTS_PAGE_SIZE)
             
             print(f"📦 Found {len(playlists)} playlists")
             
-            synced_count = 0
-            for i, playlist in enumerate(playlists, 1):
-                print(f"🔄 [{i}/{len(playlists)}] {playlist['name']} ({playlist['tracks']['total']} tracks)")
-                
-                # Store playlist metadata
-                success = self.db.store_playlist(playlist)
-                if success:
-                    synced_count += 1
-                    
-                    # Optionally sync tracks (can be slow for large playlists)
-                    if include_tracks and playlist['tracks']['total'] > 0:
-                        track_success = self.sync_playlist_tracks(playlist['id'])
-                        if track_success:
-                            print(f"  ✅ Synced {playlist['tracks']['total']} tracks")
-                        else:
-                            print(f"  ⚠️  Failed to sync tracks")
+            # A playlist whose snapshot matches the one its stored tracks came from is unchanged
+            changed = playlists
+            if include_tracks:
+                snapshots = self.db.get_playlist_snapshots()
+                changed = [playlist for playlist in playlists
+                           if not playlist.get('snapshot_id') or snapshots.get(playlist['id']) != playlist['snapshot_id']]
+                if len(changed) < len(playlists):
+                    print(f"⏭️  {len(playlists) - len(changed)} playlists unchanged since last sync")
+            
+            # Store playlist metadata in one transaction
+            synced_count = len(playlists) - len(changed)
+            if changed:
+                if not self.db.store_playlists(changed):
+                    print(f"❌ Failed to store playlists")
+                    return False
+                synced_count += len(changed)
+                print(f"💾 Stored {len(changed)} playlists")
+            
+            # Optionally sync tracks (can be slow for large playlists), every playlist
+            # concurrently. Failures are reported as they finish; on a terminal, one
+            # progress line is redrawn in place instead of a line per playlist
+            futures = {}
+            if include_tracks:
+                # Empty playlists have no tracks to fetch, so they're in sync as stored
+                self.db.set_playlist_snapshots({playlist['id']: playlist['snapshot_id'] for playlist in changed
+                                                if playlist['tracks']['total'] == 0 and playlist.get('snapshot_id')})
+                futures = {self._playlist_pool.submit(self.sync_playlist_tracks, playlist['id'],
+                                                      playlist.get('snapshot_id')): playlist
+                           for playlist in changed if playlist['tracks']['total'] > 0}
+            show_progress = sys.stdout.isatty()
+            clear_line = '\r\033[K' if show_progress else ''
+            last_drawn = 0.0
+            track_count = playlist_count = 0
+            for i, future in enumerate(as_completed(futures), 1):
+                playlist = futures[future]
+                if future.result():
+                    track_count += playlist['tracks']['total']
+                    playlist_count += 1
                 else:
-                    print(f"  ❌ Failed to store playlist")
+                    print(f"{clear_line}⚠️  Failed to sync tracks for {playlist['name']}")
                 
-                # Small delay to be nice to the API
-                time.sleep(0.1)
+                if show_progress and (i == len(futures) or time.monotonic() - last_drawn >= PROGRESS_INTERVAL):
+                    print(f"\r🔄 [{i}/{len(futures)}] {track_count} tracks synced", end='', flush=True)
+                    last_drawn = time.monotonic()
+            if futures:
+                print(f"{clear_line}✅ Synced {track_count} tracks from {playlist_count} playlists")
             
             print(f"\n🎉 Sync completed: {synced_count}/{len(playlists)} playlists synced")
             return True
@@ -97,53 +220,55 @@ class PlaylistSyncer:
             print(f"❌ Error during playlist sync: {e}")
             return False
     
-    def sync_playlist_tracks(self, playlist_id):
-        """Sync tracks for a specific playlist"""
+    def sync_playlist_tracks(self, playlist_id, snapshot_id=None):
+        """Sync tracks for a specific playlist, as of the given playlist snapshot"""
         try:
             # Get all tracks from the playlist (paginated)
-            tracks = []
-            results = self.sp.playlist_tracks(playlist_id, limit=100)
-            
-            while results:
-                tracks.extend(results['items'])
-                if results['next']:
-                    results = self.sp.next(results)
-                else:
-                    break
+            tracks = self._fetch_all_pages(partial(self.sp.playlist_tracks, playlist_id, fields=TRACK_PAGE_FIELDS), TRACKS_PAGE_SIZE)
             
             # Store tracks in database
-            return self.db.store_playlist_tracks(playlist_id, tracks)
+            return self.db.store_playlist_tracks(playlist_id, tracks, snapshot_id)
             
         except Exception as e:
             print(f"❌ Error syncing playlist tracks: {e}")
             return False
     
+    def _fetch_playlist(self, playlist_id):
+        """Fetch one playlist's current metadata, or None if it can't be fetched (e.g. deleted)"""
+        try:
+            return self._api(self.sp.playlist, playlist_id, fields=PLAYLIST_FIELDS)
+        except Exception:
+            return None
+    
     def sync_specific_playlist(self, playlist_name):
         """Sync a specific playlist by name"""
         print(f"🔍 Looking for playlist: '{playlist_name}'")
         
         try:
-            # Search for the playlist
-            results = self.sp.current_user_playlists(limit=50)
-            found_playlist = None
+            # A stored playlist with exactly this name gives its ID, so fetch just that one
+            cached = self.db.find_playlist_by_name(playlist_name, fuzzy=False)
+            found_playlist = self._fetch_playlist(cached['spotify_id']) if cached else None
+            
+            # Otherwise search the user's playlists
+            results = None if found_playlist else self._api(self.sp.current_user_playlists, limit=50)
             
-            # Check all playlists for exact or fuzzy match
+            # Check all playlists for an exact match, falling back to the first fuzzy match
+            needle = playlist_name.lower()
+            fuzzy_match = None
             while results:
-                for playlist in results['items']:
-                    if playlist['name'].lower() == playlist_name.lower():
-                        found_playlist = playlist
-                        break
-                    elif playlist_name.lower() in playlist['name'].lower():
-                        if found_playlist is None:  # First fuzzy match
-                            found_playlist = playlist
-                
+                found_playlist = next((playlist for playlist in results['items']
+                                       if playlist['name'].lower() == needle), None)
                 if found_playlist:
                     break
+                if fuzzy_match is None:
+                    fuzzy_match = next((playlist for playlist in results['items']
+                                        if needle in playlist['name'].lower()), None)
                 
                 if results['next']:
-                    results = self.sp.next(results)
+                    results = self._api(self.sp.next, results)
                 else:
                     break
+            found_playlist = found_playlist or fuzzy_match
             
             if not found_playlist:
                 print(f"❌ Playlist '{playlist_name}' not found")
@@ -155,7 +280,7 @@ class PlaylistSyncer:
             success = self.db.store_playlist(found_playlist)
             if success:
                 # Sync tracks
-                track_success = self.sync_playlist_tracks(found_playlist['id'])
+                track_success = self.sync_playlist_tracks(found_playlist['id'], found_playlist.get('snapshot_id'))
                 if track_success:
                     print(f"🎉 Successfully synced '{found_playlist['name']}'")
                     return True
@@ -207,27 +332,30 @@ def main():
     syncer = PlaylistSyncer()
     command = sys.argv[1].lower()
     
-    if command == 'all':
-        print("🚀 Syncing all playlists (metadata only)...")
-        syncer.sync_all_playlists(include_tracks=False)
+    try:
+        if command == 'all':
+            print("🚀 Syncing all playlists (metadata only)...")
+            syncer.sync_all_playlists(include_tracks=False)
         
-    elif command == 'full':
-        print("🚀 Full sync - this may take a while...")
-        syncer.sync_all_playlists(include_tracks=True)
+        elif command == 'full':
+            print("🚀 Full sync - this may take a while...")
+            syncer.sync_all_playlists(include_tracks=True)
         
-    elif command == 'sync':
-        if len(sys.argv) < 3:
-            print("❌ Please specify playlist name: python3 sync_playlists.py sync 'playlist name'")
-            return
+        elif command == 'sync':
+            if len(sys.argv) < 3:
+                print("❌ Please specify playlist name: python3 sync_playlists.py sync 'playlist name'")
+                return
         
-        playlist_name = sys.argv[2]
-        syncer.sync_specific_playlist(playlist_name)
+            playlist_name = sys.argv[2]
+            syncer.sync_specific_playlist(playlist_name)
         
-    elif command == 'list':
-        syncer.list_stored_playlists()
+        elif command == 'list':
+            syncer.list_stored_playlists()
         
-    else:
-        print(f"❌ Unknown command: {command}")
+        else:
+            print(f"❌ Unknown command: {command}")
+    finally:
+        syncer.db.close()
 
 if __name__ == "__main__":
     main()